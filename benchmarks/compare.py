@@ -0,0 +1,42 @@
+"""Compare two benchmark reports and flag regressions.
+
+    python -m benchmarks.compare baseline.json candidate.json [--threshold 0.1]
+
+Exits with 1 when any p50 got slower than the threshold allows.
+"""
+import argparse
+import json
+import sys
+
+
+def key(result):
+    return result['name'], json.dumps(result['params'], sort_keys=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare benchmark reports")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed relative p50 slowdown")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as file:
+        baseline = {key(r): r for r in json.load(file)['results']}
+    with open(args.candidate) as file:
+        candidate = json.load(file)['results']
+
+    regressions = 0
+    for result in candidate:
+        old = baseline.get(key(result))
+        if old is None or not old['p50'] or result['p50'] is None:
+            continue
+        change = result['p50'] / old['p50'] - 1
+        flag = "REGRESSION" if change > args.threshold else ""
+        regressions += bool(flag)
+        print(f"{result['name']:<14} {key(result)[1]:<60} {old['p50']:9.3f} -> {result['p50']:9.3f}"
+              f"{result['unit']} {change:+7.1%} {flag}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
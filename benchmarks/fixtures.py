@@ -0,0 +1,110 @@
+"""Deterministic benchmark fixtures: synthetic label frames, video clips and parts."""
+import os
+
+import cv2
+import numpy as np
+
+FRAME_SIZES = {'720p': (1280, 720), '1080p': (1920, 1080), '4k': (4096, 2160)}
+
+
+def label_payload(index):
+    return f"{{pm:BENCH-{index:05d},qty:{(index * 37) % 1000 + 1}}}"
+
+
+def lcsc_payload(index):
+    """Full brace payload as printed on LCSC reels, with a comma inside one value."""
+    return (f"{{pbn:PICK{index:07d},on:SO{index:08d},pc:C{index + 1000},pm:BENCH-{index:05d},"
+            f"qty:{(index * 37) % 1000 + 1},mc:,cc:1,pdi:{index},{index + 1},hp:null,wc:JS}}")
+
+
+def iso15434_payload(index):
+    """DigiKey style ISO 15434 Data Matrix payload."""
+    return (f"[)>\x1e06\x1dPBENCH-{index:05d}-ND\x1d1PBENCH-{index:05d}\x1d30PBENCH-{index:05d}-ND\x1dK"
+            f"\x1d1K{index:08d}\x1d10K{index + 1:08d}\x1d9D2301\x1d1TLOT{index}\x1d11K1\x1d4LMY"
+            f"\x1dQ{(index * 37) % 1000 + 1}\x1d11ZPICK\x1d12Z{index}\x1d13Z{index}\x1e\x04")
+
+
+def mouser_iso15434_payload(index):
+    """Mouser style ISO 15434 payload, the manufacturer part number comes first."""
+    return (f"[)>\x1e06\x1d1PBENCH-{index:05d}\x1dQ{(index * 37) % 1000 + 1}\x1dK{index:08d}"
+            f"\x1d1T{index}\x1d4LCN\x1e\x04")
+
+
+def qr_image(text, module_px):
+    code = cv2.QRCodeEncoder.create().encode(text)
+    return cv2.resize(code, None, fx=module_px, fy=module_px, interpolation=cv2.INTER_NEAREST)
+
+
+def label_frame(size, labels, module_px=4, seed=0, noise=6):
+    """A frame of the given (width, height) with `labels` QR codes scattered on a textured background.
+
+    Returns (frame, payloads). The same arguments always give the same frame.
+    """
+    rng = np.random.default_rng(seed)
+    width, height = size
+    frame = np.full((height, width, 3), 190, np.uint8)
+    frame += rng.integers(0, noise + 1, frame.shape, dtype=np.uint8)
+    payloads = []
+    cols = max(1, int(np.ceil(np.sqrt(labels * width / height))))
+    rows = max(1, int(np.ceil(labels / cols)))
+    cell_w, cell_h = width // cols, height // rows
+    for i in range(labels):
+        payload = label_payload(seed * 1000 + i)
+        code = qr_image(payload, module_px)
+        code = cv2.copyMakeBorder(code, 4 * module_px, 4 * module_px, 4 * module_px, 4 * module_px,
+                                  cv2.BORDER_CONSTANT, value=255)
+        h, w = code.shape
+        if h > cell_h or w > cell_w:
+            continue
+        row, col = divmod(i, cols)
+        x = col * cell_w + int(rng.integers(0, cell_w - w + 1))
+        y = row * cell_h + int(rng.integers(0, cell_h - h + 1))
+        frame[y:y + h, x:x + w] = code[..., None]
+        payloads.append(payload)
+    return frame, payloads
+
+
+def degrade(frame, condition, seed=0):
+    """A copy of a label frame as a hard case: low_light, glare (washed out towards one side) or blur."""
+    rng = np.random.default_rng(seed)
+    image = frame.astype(np.float32)
+    if condition == 'low_light':
+        image = image * 0.12 + rng.normal(0, 2.0, image.shape)
+    elif condition == 'glare':
+        # Specular sheen of an anti-static bag, strongest on the right
+        ramp = np.linspace(0.2, 0.85, image.shape[1], dtype=np.float32)[None, :, None]
+        image = image + (255 - image) * ramp + rng.normal(0, 2.0, image.shape)
+    elif condition == 'blur':
+        image = cv2.GaussianBlur(image, (0, 0), 1.2)
+    elif condition != 'clean':
+        raise ValueError(f"Unknown condition {condition}")
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+
+def video_clip(path, size=(1920, 1080), frames=60, fps=30, module_px=4):
+    """Write a clip of one label drifting across the frame, reusing it if it already exists."""
+    if os.path.exists(path):
+        return path
+    label = qr_image(label_payload(0), module_px)
+    label = cv2.copyMakeBorder(label, 16, 16, 16, 16, cv2.BORDER_CONSTANT, value=255)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, size)
+    h, w = label.shape
+    for i in range(frames):
+        frame = np.full((size[1], size[0], 3), 190, np.uint8)
+        x = int((size[0] - w) * i / max(1, frames - 1))
+        y = (size[1] - h) // 2
+        frame[y:y + h, x:x + w] = label[..., None]
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def inventory_parts(count):
+    for i in range(count):
+        yield {
+            'PartNumber': f"BENCH-{i:06d}",
+            'Quantity': (i * 37) % 1000 + 1,
+            'Description': f"Benchmark part {i}",
+            'DataSheet': f"https://example.invalid/{i}.pdf",
+            'ImagePath': f"https://example.invalid/{i}.jpg"
+        }
@@ -0,0 +1,359 @@
+"""Benchmarks for the decode, parse, lookup and store hot paths.
+
+    python -m benchmarks.run --output bench.json [--quick] [--only decode,store]
+    python -m benchmarks.compare old.json new.json
+
+Every run writes machine readable JSON so results can be compared between commits.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks import fixtures
+from src import Config
+
+
+def summarize(name, params, samples, unit="ms", **extra):
+    samples = np.asarray(samples, dtype=np.float64)
+    result = {
+        'name': name,
+        'params': params,
+        'unit': unit,
+        'n': int(samples.size),
+        'mean': float(samples.mean()) if samples.size else None,
+        'p50': float(np.percentile(samples, 50)) if samples.size else None,
+        'p95': float(np.percentile(samples, 95)) if samples.size else None,
+        'max': float(samples.max()) if samples.size else None,
+    }
+    result.update(extra)
+    print(f"{name:<14} {json.dumps(params):<60} p50={result['p50'] or 0:9.3f}{unit} "
+          f"p95={result['p95'] or 0:9.3f}{unit} {json.dumps(extra) if extra else ''}", file=sys.stderr)
+    return result
+
+
+def timed(fn, repeat):
+    samples = []
+    value = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples, value
+
+
+def bench_decode(quick):
+    """Per-frame latency and yield of RoiDecoder against the old 640x360 whole-frame decode."""
+    from pyzbar.pyzbar import decode
+    from src.RoiDecoder import RoiDecoder
+
+    results = []
+    sizes = ['1080p', '4k'] if quick else ['720p', '1080p', '4k']
+    repeat = 5 if quick else 20
+    for size in sizes:
+        for labels in ([1, 8] if quick else [1, 4, 16]):
+            for module_px in ([3] if quick else [2, 4]):
+                frame, payloads = fixtures.label_frame(fixtures.FRAME_SIZES[size], labels, module_px, seed=labels)
+                expected = {p.encode() for p in payloads}
+                params = {'size': size, 'labels': len(payloads), 'module_px': module_px}
+
+                def legacy():
+                    small = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), (640, 360))
+                    return {code.data for code in decode(small)}
+
+                samples, found = timed(legacy, repeat)
+                results.append(summarize('decode.legacy', params, samples,
+                                         decode_yield=len(found & expected) / max(1, len(expected))))
+
+                cold = RoiDecoder(redetect_every=1)
+                samples, codes = timed(lambda: cold.decode(frame), repeat)
+                found = {code.data for code in codes}
+                results.append(summarize('decode.roi', params, samples,
+                                         decode_yield=len(found & expected) / max(1, len(expected))))
+
+                tracked = RoiDecoder()
+                tracked.decode(frame)
+                samples, _ = timed(lambda: tracked.decode(frame), repeat)
+                results.append(summarize('decode.tracked', params, samples))
+    return results
+
+
+def bench_display(quick):
+    """The display half of process_frame: one resize into a reused buffer plus the annotated copy."""
+    results = []
+    display = np.empty((360, 640, 3), np.uint8)
+    annotated = np.empty_like(display)
+    for size in (['4k'] if quick else ['1080p', '4k']):
+        frame, _ = fixtures.label_frame(fixtures.FRAME_SIZES[size], 1)
+
+        def paint():
+            cv2.resize(frame, (640, 360), dst=display, interpolation=cv2.INTER_LINEAR)
+            np.copyto(annotated, display)
+
+        samples, _ = timed(paint, 20 if quick else 100)
+        results.append(summarize('display', {'size': size}, samples))
+    return results
+
+
+def bench_video(quick, video=None):
+    from src.RoiDecoder import RoiDecoder
+
+    path = video or fixtures.video_clip(os.path.join(tempfile.gettempdir(), "bench_clip.avi"),
+                                        frames=30 if quick else 120)
+    cap = cv2.VideoCapture(path)
+    decoder = RoiDecoder()
+    samples = []
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        start = time.perf_counter()
+        decoder.decode(frame)
+        samples.append((time.perf_counter() - start) * 1000)
+    cap.release()
+    fps = 1000 / np.mean(samples) if samples else 0
+    return [summarize('video', {'clip': os.path.basename(path)}, samples, fps=fps, **decoder.stats())]
+
+
+def bench_preprocess(quick):
+    """Decode yield and per-frame cost on degraded labels, with the pre-processing ladder off and on."""
+    from src.RoiDecoder import RoiDecoder
+
+    results = []
+    seeds = range(3 if quick else 8)
+    for condition in ['clean', 'low_light', 'glare', 'blur']:
+        frames = []
+        for seed in seeds:
+            frame, payloads = fixtures.label_frame(fixtures.FRAME_SIZES['1080p'], 4, 3, seed=seed)
+            frames.append((fixtures.degrade(frame, condition, seed), {p.encode() for p in payloads}))
+        for preprocess in ([], list(Config.PREPROCESS)):
+            samples, found, expected = [], 0, 0
+            decoder = RoiDecoder(redetect_every=1, preprocess=preprocess)
+            for frame, payloads in frames:
+                frame_samples, codes = timed(lambda: decoder.decode(frame), 3 if quick else 10)
+                samples.extend(frame_samples)
+                found += len({code.data for code in codes} & payloads)
+                expected += len(payloads)
+            stats = decoder.stats()
+            results.append(summarize('preprocess', {'condition': condition, 'steps': ','.join(preprocess) or 'off'},
+                                     samples, decode_yield=found / max(1, expected),
+                                     escalations=stats['escalations'], rescued=stats['rescued']))
+    return results
+
+
+def bench_parse(quick):
+    """Label parsing throughput per format, uncached (first sighting) and cached (label still in view)."""
+    from src.LabelParser import _parse_text
+    from src.Utils import extract_part_data
+
+    results = []
+    rounds = 3 if quick else 20
+    payload_sets = {
+        'brace': [fixtures.label_payload(i).encode() for i in range(1000)],
+        'lcsc': [fixtures.lcsc_payload(i).encode() for i in range(1000)],
+        'iso15434': [fixtures.iso15434_payload(i).encode() for i in range(1000)],
+        'iso15434_1p': [fixtures.mouser_iso15434_payload(i).encode() for i in range(1000)],
+    }
+    for name, payloads in payload_sets.items():
+        # Payloads yielding a part number, a parser dropping fields shows up here rather than as a speed up
+        parsed = sum(1 for payload in payloads if extract_part_data(payload).get('pm'))
+        for cached in (False, True):
+            samples = []
+            for _ in range(rounds):
+                if not cached:
+                    _parse_text.cache_clear()
+                start = time.perf_counter()
+                for payload in payloads:
+                    extract_part_data(payload)
+                samples.append((time.perf_counter() - start) * 1e6 / len(payloads))
+            results.append(summarize('parse', {'format': name, 'cached': cached, 'payloads': len(payloads)},
+                                     samples, unit="us", per_second=1e6 / float(np.median(samples)),
+                                     parsed=parsed))
+    return results
+
+
+def bench_store(quick):
+    """Primary key lookup and search latency as the inventory grows."""
+    from src.InventoryStore import InventoryStore
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for count in ([1000, 10000] if quick else [1000, 10000, 100000]):
+            store = InventoryStore(os.path.join(directory, f"store_{count}.sqlite"), batch_size=5000)
+            start = time.perf_counter()
+            for part in fixtures.inventory_parts(count):
+                store.upsert_part(part)
+                store.add_code(f"code-{part['PartNumber']}")
+            store.flush()
+            load_seconds = time.perf_counter() - start
+
+            rng = random.Random(count)
+            keys = [f"BENCH-{rng.randrange(count):06d}" for _ in range(2000)]
+            samples = []
+            for key in keys:
+                start = time.perf_counter()
+                store.get_part(key)
+                store.has_code(f"code-{key}")
+                samples.append((time.perf_counter() - start) * 1e6)
+            results.append(summarize('store.lookup', {'parts': count}, samples, unit="us",
+                                     load_seconds=load_seconds))
+
+            # A page of search results with their totals, as the inventory browser asks for them
+            for kind, queries in (('substring', [f"part {rng.randrange(count)}"[:-1] for _ in range(50)]),
+                                  ('short', [str(rng.randrange(10, 100)) for _ in range(20)])):
+                samples = []
+                for i, query in enumerate(queries):
+                    start = time.perf_counter()
+                    store.search_parts(query, ('PartNumber', 'Quantity', 'Description')[i % 3], bool(i % 2), 200)
+                    store.search_totals(query)
+                    samples.append((time.perf_counter() - start) * 1000)
+                results.append(summarize('store.search', {'parts': count, 'query': kind}, samples))
+            store.close()
+    return results
+
+
+def bench_end_to_end(quick, latency):
+    """Frame in to displayable part out: decode, parse, Mouser lookup against a stub, store."""
+    from src import Config
+    from src.InventoryStore import InventoryStore
+    from src.MouserStub import MouserStubServer
+    from src.PartLookup import PartLookup
+    from src.ResponseCache import ResponseCache
+    from src.RoiDecoder import RoiDecoder
+    from src.Utils import extract_part_data, make_part
+
+    results = []
+    server = MouserStubServer(latency=latency)
+    server.start()
+    Config.MOUSER_API_URL = server.api_url
+    labels = 4 if quick else 16
+    frames = [fixtures.label_frame(fixtures.FRAME_SIZES['1080p'], 1, 4, seed=i)[0] for i in range(labels)]
+    with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(io.StringIO()):
+        cache = ResponseCache(os.path.join(directory, "cache.sqlite"), 3600, 3600)
+        lookup = PartLookup(cache, calls_per_minute=0)
+        store = InventoryStore(os.path.join(directory, "store.sqlite"))
+        decoder = RoiDecoder(redetect_every=1)
+        for phase in ('cold', 'warm'):
+            samples = []
+            for frame in frames:
+                start = time.perf_counter()
+                for code in decoder.decode(frame):
+                    parsed = extract_part_data(code.data)
+                    state, info = lookup.lookup(parsed['pm']).result()
+                    part = make_part(parsed['pm'], parsed['qty'], info)
+                    store.upsert_part(part)
+                    '\n'.join(f"{key}: {value}" for key, value in part.items())
+                samples.append((time.perf_counter() - start) * 1000)
+            results.append(summarize('end_to_end', {'phase': phase, 'stub_latency_ms': latency * 1000}, samples,
+                                     network_calls=server.request_count))
+        lookup.close()
+        store.close()
+        cache.close()
+    server.shutdown()
+    return results
+
+
+def bench_pipeline(quick):
+    """Headless pipeline fed by a synthetic camera at full speed: frames/s, new codes/s and capture to code latency."""
+    from src.FrameSource import SyntheticSource
+    from src.HeadlessScanner import HeadlessScanner
+
+    results = []
+    for labels in ([4] if quick else [4, 16]):
+        source = SyntheticSource(fixtures.FRAME_SIZES['1080p'], labels, dwell=2.0, speed=0, frames=60 if quick else 240)
+        scanner = HeadlessScanner()
+        for _ in scanner.scan_source(source, 'synthetic'):
+            pass
+        stats = scanner.stats
+        results.append(summarize('pipeline', {'labels': labels, 'workers': scanner.workers}, scanner.latencies,
+                                 fps=stats['fps'], scans_per_second=stats['scans_per_second'],
+                                 decode_p50=stats['decode_p50'], shown=stats['labels_shown'],
+                                 decoded=stats['labels_decoded']))
+    return results
+
+
+# Modules the GUI fast path must not import before the window is up
+DEFERRED_MODULES = ['requests', 'PyQt5.QtWebEngineWidgets', 'PyQt5.QtNetwork']
+
+
+def bench_startup(quick):
+    """Cold interpreter import of the GUI module, and which heavy modules it drags in."""
+    script = ("import sys, time; start = time.perf_counter(); import src.QrReader; "
+              "print((time.perf_counter() - start) * 1000); "
+              f"print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))")
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    samples = []
+    loaded = ""
+    for _ in range(3 if quick else 10):
+        output = subprocess.check_output([sys.executable, "-c", script], text=True, env=env).splitlines()
+        samples.append(float(output[0]))
+        loaded = output[1] if len(output) > 1 else ""
+    return [summarize('startup.import', {'module': 'src.QrReader'}, samples,
+                      deferred_modules_loaded=[m for m in loaded.split(',') if m])]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inventory scanner benchmarks")
+    parser.add_argument("--output", help="JSON file to write, defaults to stdout")
+    parser.add_argument("--quick", action="store_true", help="fewer sizes and repetitions")
+    parser.add_argument("--only", help="comma separated subset of: decode,display,video,preprocess,parse,store,end_to_end,pipeline,startup")
+    parser.add_argument("--video", help="recorded clip to use instead of the synthetic one")
+    parser.add_argument("--stub-latency", type=float, default=0.05, help="seconds the stub Mouser API waits")
+    args = parser.parse_args(argv)
+
+    benches = {
+        'decode': lambda: bench_decode(args.quick),
+        'display': lambda: bench_display(args.quick),
+        'video': lambda: bench_video(args.quick, args.video),
+        'preprocess': lambda: bench_preprocess(args.quick),
+        'parse': lambda: bench_parse(args.quick),
+        'store': lambda: bench_store(args.quick),
+        'end_to_end': lambda: bench_end_to_end(args.quick, args.stub_latency),
+        'pipeline': lambda: bench_pipeline(args.quick),
+        'startup': lambda: bench_startup(args.quick),
+    }
+    selected = args.only.split(',') if args.only else list(benches)
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': time.time(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'opencv': cv2.__version__,
+            'cpu_count': os.cpu_count(),
+            'quick': args.quick,
+        },
+        'results': [],
+    }
+    for name in selected:
+        report['results'].extend(benches[name]())
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,44 @@
+import time
+
+STARTED_AT = time.perf_counter()
+
+import importlib
+import logging
 import sys
-from PyQt5.QtWidgets import QApplication
-from src.QrReader import QrReader as App
+
+from src.Logger import setup_logging
+
+log = logging.getLogger(__name__)
+
+# main.py <command> ... runs one of these instead of the app
+COMMANDS = {
+    'scan': 'src.HeadlessScanner',
+    'journal': 'src.ScanJournal',
+    'enrich': 'src.EnrichmentQueue',
+    'serve': 'src.ScanServer',
+    'station': 'src.ScanClient',
+}
 
 if __name__ == "__main__":
-    print("Starting Up...")
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        # Command line modes never import Qt
+        command = importlib.import_module(COMMANDS[sys.argv[1]])
+        sys.exit(command.main(sys.argv[2:]))
+
+    setup_logging()
+    from src.StartupTimer import StartupTimer
+    startup = StartupTimer(STARTED_AT)
+    from PyQt5.QtCore import QCoreApplication, Qt
+    from PyQt5.QtWidgets import QApplication
+    from src.QrReader import QrReader as App
+    startup.mark('imports')
+
+    log.info("Starting Up...")
+    # Lets QtWebEngine be imported after the application exists, the PDF viewer loads on first use
+    QCoreApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
     app = QApplication(sys.argv)
-    print("Application Started")
-    window = App()
-    print("Window Created")
+    log.info("Application Started")
+    window = App(startup)
+    log.info("Window Created")
     window.show()
-    sys.exit(app.exec())
\ No newline at end of file
+    sys.exit(app.exec())
@@ -0,0 +1,134 @@
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+# Mouser's CDN refuses requests without a browser-like user agent
+DOWNLOAD_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.159 Safari/537.36',
+    'Referer': 'https://www.mouser.com'
+}
+
+
+class AssetCache:
+    """Content-addressed disk cache for datasheets and part images.
+
+    Files are stored once under the SHA-256 of their content, an index maps
+    URLs to digests. When the cache grows past `max_bytes` the least recently
+    used files are evicted.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(directory, "blobs"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(directory, "index.sqlite"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS urls ("
+            " url TEXT PRIMARY KEY,"
+            " digest TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS blobs ("
+            " digest TEXT PRIMARY KEY,"
+            " filename TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_access REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS blobs_last_access ON blobs (last_access);"
+        )
+        self._conn.commit()
+        self.total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def _blob_path(self, filename):
+        return os.path.join(self.directory, "blobs", filename[:2], filename)
+
+    @staticmethod
+    def _extension(url):
+        # Keep the extension so viewers like QWebEngine recognise the file type
+        extension = os.path.splitext(url.split('?', 1)[0])[1].lower()
+        return extension if len(extension) <= 5 else ""
+
+    def get(self, url):
+        """Return the local path of a cached URL, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT blobs.digest, blobs.filename FROM urls JOIN blobs ON urls.digest = blobs.digest"
+                " WHERE urls.url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            digest, filename = row
+            path = self._blob_path(filename)
+            if not os.path.exists(path):
+                self._forget(digest)
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE blobs SET last_access = ? WHERE digest = ?", (time.time(), digest))
+            self._conn.commit()
+        return path
+
+    def put_file(self, url, source_path):
+        """Move a downloaded file into the cache under its content hash and return the cached path."""
+        digest = hashlib.sha256()
+        with open(source_path, "rb") as file:
+            for chunk in iter(lambda: file.read(1 << 20), b""):
+                digest.update(chunk)
+        digest = digest.hexdigest()
+        size = os.path.getsize(source_path)
+
+        with self._lock:
+            row = self._conn.execute("SELECT filename FROM blobs WHERE digest = ?", (digest,)).fetchone()
+            filename = row[0] if row else digest + self._extension(url)
+            path = self._blob_path(filename)
+            if row and os.path.exists(path):
+                # Same content under another URL, store it once
+                os.remove(source_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(source_path, path)
+                if not row:
+                    # A row whose file went missing is already counted in total_bytes
+                    self.total_bytes += size
+            self._conn.execute("INSERT OR REPLACE INTO urls (url, digest) VALUES (?, ?)", (url, digest))
+            self._conn.execute("INSERT OR REPLACE INTO blobs (digest, filename, size, last_access) VALUES (?, ?, ?, ?)",
+                               (digest, filename, size, time.time()))
+            self._evict(keep=digest)
+            self._conn.commit()
+        return path
+
+    def put(self, url, data):
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        return self.put_file(url, temp_path)
+
+    def _forget(self, digest):
+        row = self._conn.execute("SELECT filename, size FROM blobs WHERE digest = ?", (digest,)).fetchone()
+        if row is None:
+            return
+        filename, size = row
+        try:
+            os.remove(self._blob_path(filename))
+        except FileNotFoundError:
+            pass
+        # total_bytes follows the rows, whether or not the file was still there
+        self.total_bytes -= size
+        self._conn.execute("DELETE FROM urls WHERE digest = ?", (digest,))
+        self._conn.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+
+    def _evict(self, keep=None):
+        """Drop least recently used files until the cache fits in max_bytes."""
+        while self.total_bytes > self.max_bytes:
+            row = self._conn.execute(
+                "SELECT digest FROM blobs WHERE digest != ? ORDER BY last_access LIMIT 1", (keep or "",)
+            ).fetchone()
+            if row is None:
+                break
+            self._forget(row[0])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
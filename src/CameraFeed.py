@@ -0,0 +1,66 @@
+import cv2
+import numpy as np
+
+from src.FrameBufferPool import LatestFrame
+from src.Metrics import metrics
+
+
+class CameraFeed:
+    """Display side of one camera: its newest frame, latest detections and reused display buffers."""
+
+    def __init__(self, camera_id, camera_thread, display_size, tile_size=None):
+        self.camera_id = camera_id
+        self.camera_thread = camera_thread
+        self.display_size = display_size
+        self.latest_frame = LatestFrame()
+        # Allocated once and reused for every frame
+        self.display_buffer = np.empty((display_size[1], display_size[0], 3), np.uint8)
+        self.annotated_buffer = np.empty_like(self.display_buffer)
+        self.tile_size = tile_size
+        self.tile_buffer = np.empty((tile_size[1], tile_size[0], 3), np.uint8) if tile_size else None
+        self.last_detections = None
+        self.last_frame_size = None
+
+    @property
+    def name(self):
+        return f"Camera {self.camera_id + 1}"
+
+    def update_detections(self, result):
+        self.last_detections = result.codes
+        self.last_frame_size = result.frame_size
+
+    def render(self):
+        """Resize the newest frame into the display buffers and draw detections, False if nothing new arrived."""
+        buffer = self.latest_frame.take()
+        if buffer is None:
+            return False
+        try:
+            with metrics.timer('display.resize'):
+                cv2.resize(buffer.array, self.display_size, dst=self.display_buffer, interpolation=cv2.INTER_LINEAR)
+        finally:
+            buffer.release()
+        np.copyto(self.annotated_buffer, self.display_buffer)
+        self.draw_detections(self.annotated_buffer)
+        if self.tile_buffer is not None:
+            cv2.resize(self.annotated_buffer, self.tile_size, dst=self.tile_buffer, interpolation=cv2.INTER_AREA)
+        return True
+
+    def draw_detections(self, feed):
+        detections = self.last_detections or []
+        cv2.putText(feed, f'Detections: {len(detections)}', (10, 10), cv2.FONT_HERSHEY_PLAIN, 1, (0, 0, 255), 1)
+
+        # Polygons come back in full frame coordinates, scale them to the display
+        scale_x = self.display_size[0] / self.last_frame_size[0] if detections else 1
+        scale_y = self.display_size[1] / self.last_frame_size[1] if detections else 1
+        for qr_code in detections:
+            points = [(x * scale_x, y * scale_y) for x, y in qr_code.polygon]
+            if len(points) > 4:
+                hull = cv2.convexHull(np.array([point for point in points], dtype=np.float32))
+                hull = list(map(tuple, np.squeeze(hull)))
+            else:
+                hull = points
+            n = len(hull)
+            for j in range(n):
+                pt1 = tuple(map(int, hull[j]))
+                pt2 = tuple(map(int, hull[(j + 1) % n]))
+                cv2.line(feed, pt1, pt2, (60, 255, 0), 5)
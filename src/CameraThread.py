@@ -1,34 +1,99 @@
-import cv2
-import numpy as np
+import logging
+import time
+
 from PyQt5.QtCore import QThread, pyqtSignal
+from src import Config
+from src.CaptureGovernor import CaptureGovernor
+from src.FrameBufferPool import FrameBufferPool
+from src.FrameSource import open_source, parse_properties
+from src.Metrics import metrics
 
-class CameraThread(QThread):
-    frame_captured = pyqtSignal(np.ndarray)
+log = logging.getLogger(__name__)
 
-    FRAME_WIDTH = 4096
-    FRAME_HEIGHT = 2160
 
-    def __init__(self):
+class CameraThread(QThread):
+    # Emits a pooled FrameBuffer. Receivers must be connected with Qt.DirectConnection
+    # and retain() the buffer if they keep it, it is reused once everyone released it.
+    frame_captured = pyqtSignal(object)
+
+    def __init__(self, source=Config.CAMERA_SOURCE, backend=Config.CAMERA_BACKEND,
+                 frame_size=(Config.CAMERA_WIDTH, Config.CAMERA_HEIGHT), fps=Config.CAMERA_FPS,
+                 idle_frame_size=(Config.CAMERA_IDLE_WIDTH, Config.CAMERA_IDLE_HEIGHT),
+                 idle_fps=Config.CAMERA_IDLE_FPS, idle_after=Config.CAMERA_IDLE_AFTER,
+                 properties=Config.CAMERA_PROPERTIES, fourcc=Config.CAMERA_FOURCC, camera_id=0):
         super().__init__()
-        self.cap = None
+        self.camera_id = camera_id
+        self.interval_metric = f'capture.interval.cam{camera_id}'
+        self.cap = None  # The FrameSource, opened on the capture thread
         self.running = True
+        # A device index, or a stream, recording or synthetic source standing in for a camera
+        self.source = source
+        self.backend = backend
+        self.frame_size = frame_size
+        self.fps = fps
+        self.idle_frame_size = idle_frame_size
+        self.idle_fps = idle_fps
+        self.properties = parse_properties(properties) if isinstance(properties, str) else dict(properties or {})
+        self.fourcc = fourcc
+        self.governor = CaptureGovernor(idle_after)
+        self.idle_mode = False
+        self.buffers = FrameBufferPool((frame_size[1], frame_size[0], 3))
+
+    def open_capture(self):
+        return open_source(self.source, self.backend, self.fourcc, self.properties)
+
+    def apply_mode(self, idle):
+        """Switch the camera between its full and idle resolution and rate."""
+        self.idle_mode = idle
+        if not self.cap.live:
+            return
+        width, height = self.idle_frame_size if idle else self.frame_size
+        self.cap.set_mode((width, height), self.idle_fps if idle else self.fps)
+        log.info("Camera %d %s: %dx%d", self.camera_id + 1, 'idle' if idle else 'active', width, height)
+
+    def report_activity(self):
+        """Called from the decoder when a code or a new candidate region shows up."""
+        self.governor.report_activity()
 
     def run(self):
-        self.cap = cv2.VideoCapture(1, cv2.CAP_DSHOW)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.FRAME_WIDTH)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.FRAME_HEIGHT)
-        self.cap.set(cv2.CAP_PROP_AUTOFOCUS, 1)
-        self.cap.set(cv2.CAP_PROP_CONTRAST, 105)
-        self.cap.set(cv2.CAP_PROP_SHARPNESS, 125)
-        self.cap.set(cv2.CAP_PROP_BRIGHTNESS, 130)
-        self.cap.set(cv2.CAP_PROP_SATURATION, 130)
+        try:
+            self.cap = self.open_capture()
+        except ValueError as e:
+            log.error("Camera %d: %s", self.camera_id + 1, e)
+            return
+        self.apply_mode(False)
+        last_frame_at = None
 
         while self.running:  # Run while the flag is True
-            ret, frame = self.cap.read()
+            idle = self.governor.idle()
+            if idle != self.idle_mode:
+                self.apply_mode(idle)
+            if self.cap.live:
+                self.governor.pace(self.idle_fps if idle else self.fps)  # Other sources pace themselves
+
+            buffer = self.buffers.acquire()
+            with metrics.timer('capture.read'):
+                ret, frame = self.cap.read(buffer.array)  # Reads into the pooled array when the shape matches
             if ret:
-                self.frame_captured.emit(frame)
+                now = time.perf_counter()
+                if last_frame_at is not None:
+                    metrics.observe(self.interval_metric, (now - last_frame_at) * 1000)
+                last_frame_at = now
+                if frame is not buffer.array:
+                    # The camera delivered another resolution, adopt the new shape
+                    buffer.release()
+                    buffer = self.buffers.wrap(frame)
+                self.frame_captured.emit(buffer)
+            elif self.cap.ended:
+                log.info("Camera %d: %s ended", self.camera_id + 1, self.source)
+                buffer.release()
+                break
+            else:
+                time.sleep(0.05)  # Don't spin while the device is unavailable
+            buffer.release()
 
     def release(self):
         self.running = False  # Stop the loop in run
+        self.wait()
         if self.cap is not None:
             self.cap.release()
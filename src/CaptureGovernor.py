@@ -0,0 +1,36 @@
+import threading
+import time
+
+
+class CaptureGovernor:
+    """Paces camera reads and decides when capture can drop to idle settings.
+
+    Decoders call report_activity() whenever a code is decoded or a new
+    candidate region appears. After `idle_after` seconds without activity
+    idle() turns True, and it flips back on the next report.
+    """
+
+    def __init__(self, idle_after):
+        self.idle_after = idle_after
+        self._lock = threading.Lock()
+        self._last_activity = time.monotonic()
+        self._next_tick = 0.0
+
+    def report_activity(self):
+        with self._lock:
+            self._last_activity = time.monotonic()
+
+    def idle(self):
+        with self._lock:
+            return self.idle_after > 0 and time.monotonic() - self._last_activity > self.idle_after
+
+    def pace(self, fps):
+        """Sleep until the next frame is due at the given rate, a rate of 0 never sleeps."""
+        if fps <= 0:
+            return
+        now = time.monotonic()
+        # Never try to catch up on ticks missed while a read was slow
+        self._next_tick = max(self._next_tick + 1.0 / fps, now)
+        delay = self._next_tick - now
+        if delay > 0:
+            time.sleep(delay)
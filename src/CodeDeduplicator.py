@@ -0,0 +1,56 @@
+import threading
+import time
+from collections import OrderedDict
+
+from src import Config
+from src.Metrics import metrics
+
+NEW = 'new'  # Never seen before, now recorded in the store
+KNOWN = 'known'  # Already in the store from an earlier scan
+DEBOUNCED = 'debounced'  # Seen within the debounce window, ignore it
+
+
+class CodeDeduplicator:
+    """Decides once per sighting whether a decoded code is new, known or a repeat to ignore.
+
+    Recent sightings live in a TTL-LRU: an OrderedDict kept in sighting order,
+    so expired entries are popped from the front and the size cap evicts the
+    oldest. The persistent "seen" set is the store's indexed codes table, so
+    nothing has to be loaded at startup.
+    """
+
+    def __init__(self, store, window=Config.DEDUP_WINDOW, max_entries=Config.DEDUP_MAX_ENTRIES,
+                 clock=time.monotonic):
+        self.store = store
+        self.window = window
+        self.max_entries = max_entries
+        self.clock = clock
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, code):
+        """Classify a sighting as NEW, KNOWN or DEBOUNCED, recording it in the store if new."""
+        now = self.clock()
+        with self._lock:
+            self._expire(now)
+            if code in self._recent:
+                metrics.count('dedup.debounced')
+                return DEBOUNCED
+            self._recent[code] = now
+            if len(self._recent) > self.max_entries:
+                self._recent.popitem(last=False)
+        if self.store.add_code(code):
+            metrics.count('dedup.new')
+            return NEW
+        metrics.count('dedup.known')
+        return KNOWN
+
+    def _expire(self, now):
+        while self._recent:
+            code, seen_at = next(iter(self._recent.items()))
+            if now - seen_at < self.window:
+                break
+            self._recent.popitem(last=False)
+
+    def __len__(self):
+        return len(self._recent)
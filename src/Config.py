@@ -0,0 +1,120 @@
+import logging
+import os
+import sys
+from dotenv import load_dotenv
+
+# Read .env once at import instead of on every lookup
+load_dotenv()
+
+log = logging.getLogger(__name__)
+
+
+def env_str(name, default=None):
+    value = os.getenv(name)
+    return value if value not in (None, "") else default
+
+
+def env_int(name, default):
+    value = os.getenv(name)
+    try:
+        return int(value) if value not in (None, "") else default
+    except ValueError:
+        log.warning("%s=%r is not an integer, using %s", name, value, default)
+        return default
+
+
+def env_float(name, default):
+    value = os.getenv(name)
+    try:
+        return float(value) if value not in (None, "") else default
+    except ValueError:
+        log.warning("%s=%r is not a number, using %s", name, value, default)
+        return default
+
+
+MOUSER_API_KEY = env_str("MOUSER_API_KEY")
+MOUSER_API_URL = env_str("MOUSER_API_URL", "https://api.mouser.com/api/v1")
+MOUSER_TIMEOUT = env_float("MOUSER_TIMEOUT", 10.0)
+# Mouser allows 30 calls per minute on the search API
+MOUSER_CALLS_PER_MINUTE = env_float("MOUSER_CALLS_PER_MINUTE", 30.0)
+# Up to 10 part numbers can be searched in one call, separated by '|'
+MOUSER_BATCH_SIZE = env_int("MOUSER_BATCH_SIZE", 10)
+
+LOOKUP_WORKERS = env_int("LOOKUP_WORKERS", 2)
+LOOKUP_BATCH_WINDOW = env_float("LOOKUP_BATCH_WINDOW", 0.05)
+LOOKUP_CACHE_PATH = env_str("LOOKUP_CACHE_PATH", "lookup_cache.sqlite")
+LOOKUP_CACHE_TTL = env_float("LOOKUP_CACHE_TTL", 30 * 24 * 3600)
+LOOKUP_NEGATIVE_TTL = env_float("LOOKUP_NEGATIVE_TTL", 24 * 3600)
+# Background enrichment of parts stored without Mouser info: lookups outstanding at once, how often
+# the store is polled and the exponential backoff after failures, from BASE up to MAX seconds
+ENRICH_MAX_IN_FLIGHT = env_int("ENRICH_MAX_IN_FLIGHT", 20)
+ENRICH_POLL_INTERVAL = env_float("ENRICH_POLL_INTERVAL", 5.0)
+ENRICH_BACKOFF_BASE = env_float("ENRICH_BACKOFF_BASE", 2.0)
+ENRICH_BACKOFF_MAX = env_float("ENRICH_BACKOFF_MAX", 600.0)
+
+INVENTORY_DB_PATH = env_str("INVENTORY_DB_PATH", "inventory.sqlite")
+# Inventory browser: rows fetched from the store per page and how long typing pauses before searching
+INVENTORY_PAGE_SIZE = env_int("INVENTORY_PAGE_SIZE", 200)
+INVENTORY_SEARCH_DELAY_MS = env_int("INVENTORY_SEARCH_DELAY_MS", 150)
+# A code seen again within DEDUP_WINDOW seconds is ignored, at most DEDUP_MAX_ENTRIES recent codes are remembered
+DEDUP_WINDOW = env_float("DEDUP_WINDOW", 20.0)
+DEDUP_MAX_ENTRIES = env_int("DEDUP_MAX_ENTRIES", 10000)
+# Append-only scan event journal, written in batches with one fsync per JOURNAL_FLUSH_INTERVAL seconds at most
+JOURNAL_PATH = env_str("JOURNAL_PATH", "scans.jsonl")
+JOURNAL_FLUSH_INTERVAL = env_float("JOURNAL_FLUSH_INTERVAL", 0.5)
+JOURNAL_BATCH_SIZE = env_int("JOURNAL_BATCH_SIZE", 256)
+
+# Camera: CAMERA_SOURCE is a device index, or a stream, recording or synthetic source standing in
+# for one, e.g. 'clip.mp4?speed=2' or 'synthetic?labels=8' (see src/FrameSource.py)
+CAMERA_SOURCE = env_str("CAMERA_SOURCE", "1")
+# Comma separated sources for several cameras sharing one decode pool, defaults to CAMERA_SOURCE alone
+CAMERA_SOURCES = [source.strip() for source in env_str("CAMERA_SOURCES", CAMERA_SOURCE).split(',') if source.strip()]
+# any, dshow, msmf, v4l2, ffmpeg or gstreamer, defaults to the native backend of the platform
+CAMERA_BACKEND = env_str("CAMERA_BACKEND", "dshow" if sys.platform == "win32" else "v4l2" if sys.platform.startswith("linux") else "any")
+CAMERA_FOURCC = env_str("CAMERA_FOURCC")
+CAMERA_WIDTH = env_int("CAMERA_WIDTH", 4096)
+CAMERA_HEIGHT = env_int("CAMERA_HEIGHT", 2160)
+CAMERA_FPS = env_float("CAMERA_FPS", 30.0)
+# Drop to the idle resolution and rate when nothing has been seen for CAMERA_IDLE_AFTER seconds
+CAMERA_IDLE_WIDTH = env_int("CAMERA_IDLE_WIDTH", 1280)
+CAMERA_IDLE_HEIGHT = env_int("CAMERA_IDLE_HEIGHT", 720)
+CAMERA_IDLE_FPS = env_float("CAMERA_IDLE_FPS", 5.0)
+CAMERA_IDLE_AFTER = env_float("CAMERA_IDLE_AFTER", 10.0)
+# Enhancements tried, in order, on candidate regions that don't decode as they are: comma separated
+# clahe, sharpen, threshold and deskew, empty to turn pre-processing off. At most PREPROCESS_BUDGET
+# regions per frame are escalated
+PREPROCESS = [step.strip() for step in env_str("PREPROCESS", "clahe,sharpen,threshold,deskew").split(',') if step.strip()]
+PREPROCESS_BUDGET = env_int("PREPROCESS_BUDGET", 2)
+# Decode threads shared by all cameras, 0 uses one per camera plus one, capped at the core count
+DECODE_WORKERS = env_int("DECODE_WORKERS", 0)
+# Comma separated NAME=value pairs, NAME being a cv2.CAP_PROP_* suffix
+CAMERA_PROPERTIES = env_str("CAMERA_PROPERTIES", "AUTOFOCUS=1,CONTRAST=105,SHARPNESS=125,BRIGHTNESS=130,SATURATION=130")
+
+# 'main.py serve': where the scan service listens, the largest frame it accepts and how many
+# events a slow /events subscriber can fall behind before it starts missing them
+SERVER_HOST = env_str("SERVER_HOST", "127.0.0.1")
+SERVER_PORT = env_int("SERVER_PORT", 8750)
+SERVER_MAX_BODY = env_int("SERVER_MAX_BODY", 32 * 1024 * 1024)
+SERVER_EVENT_BACKLOG = env_int("SERVER_EVENT_BACKLOG", 1000)
+# 'main.py station': the scan service to send frames to, how many per second and their JPEG quality
+STATION_SERVER_URL = env_str("STATION_SERVER_URL", "http://127.0.0.1:8750")
+STATION_FPS = env_float("STATION_FPS", 5.0)
+STATION_JPEG_QUALITY = env_int("STATION_JPEG_QUALITY", 90)
+
+# Datasheets and part images, evicted least recently used first past the size cap
+ASSET_CACHE_DIR = env_str("ASSET_CACHE_DIR", "asset_cache")
+ASSET_CACHE_MAX_BYTES = env_int("ASSET_CACHE_MAX_BYTES", 1024 * 1024 * 1024)
+PIXMAP_CACHE_KB = env_int("PIXMAP_CACHE_KB", 32 * 1024)
+
+# DEBUG, INFO, WARNING or ERROR. Each message is let through at most LOG_RATE_BURST
+# times per LOG_RATE_INTERVAL seconds so per-frame messages can't flood the console
+LOG_LEVEL = env_str("LOG_LEVEL", "INFO")
+LOG_RATE_INTERVAL = env_float("LOG_RATE_INTERVAL", 10.0)
+LOG_RATE_BURST = env_int("LOG_RATE_BURST", 5)
+
+# Rolling metrics: samples kept per timer, where to export them (.json or .prom) and how often
+METRICS_WINDOW = env_int("METRICS_WINDOW", 1024)
+METRICS_EXPORT_PATH = env_str("METRICS_EXPORT_PATH")
+METRICS_EXPORT_INTERVAL = env_float("METRICS_EXPORT_INTERVAL", 15.0)
+# 1 draws FPS, decode p95 and queue depth on the bounding box feed
+METRICS_OVERLAY = env_int("METRICS_OVERLAY", 0)
@@ -0,0 +1,169 @@
+import logging
+import threading
+import time
+from collections import namedtuple
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from src.Metrics import metrics
+
+log = logging.getLogger(__name__)
+
+# frame_size is the (width, height) of the frame the code polygons refer to,
+# source the camera the frame came from
+DecodeResult = namedtuple('DecodeResult', ['frame_id', 'codes', 'latency', 'frame_size', 'source'])
+
+
+class SourceStats:
+    def __init__(self):
+        self.frames_submitted = 0
+        self.frames_dropped = 0
+        self.frames_decoded = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self.total_latency = 0.0
+
+    def as_dict(self):
+        decoded = self.frames_decoded
+        return {
+            'frames_submitted': self.frames_submitted,
+            'frames_dropped': self.frames_dropped,
+            'frames_decoded': decoded,
+            'last_latency': self.last_latency,
+            'max_latency': self.max_latency,
+            'avg_latency': self.total_latency / decoded if decoded else 0.0,
+        }
+
+
+class DecodePool(QObject):
+    """Fixed pool of decode workers shared by one or more cameras.
+
+    Each source has a single pending slot holding its most recent frame. If the
+    workers are still busy a new frame replaces the pending one and is counted as
+    dropped, so nothing ever queues up. Workers serve the sources round robin, so
+    a fast camera can't starve a slow one. Every source has its own decoder,
+    which keeps RoiDecoder's region tracking per camera.
+    """
+    codes_decoded = pyqtSignal(object)
+
+    def __init__(self, decoder=None, workers=2):
+        super().__init__()
+        self.worker_count = workers
+        self.running = False
+        self._condition = threading.Condition()
+        self._decoders = {}
+        self._sources = []  # Round robin order
+        self._next_source = 0
+        self._pending = {}
+        self._stats = {}
+        self._next_frame_id = 0
+        self._threads = []
+        self._busy = 0
+        if decoder is not None:
+            self.add_source(0, decoder)
+
+    def add_source(self, source, decoder):
+        with self._condition:
+            self._decoders[source] = decoder
+            if source not in self._stats:
+                self._sources.append(source)
+                self._stats[source] = SourceStats()
+
+    def start(self):
+        self.running = True
+        for i in range(self.worker_count):
+            thread = threading.Thread(target=self._work, name=f"decode-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, buffer, source=0):
+        """Hand a frame buffer to the pool, replacing any frame of the same source no worker has picked up yet."""
+        buffer.retain()
+        with self._condition:
+            stats = self._stats[source]
+            stats.frames_submitted += 1
+            dropped = self._pending.get(source)
+            if dropped is not None:
+                stats.frames_dropped += 1
+                metrics.count('decode.dropped')
+            self._pending[source] = (self._next_frame_id, buffer, time.perf_counter())
+            self._next_frame_id += 1
+            self._condition.notify()
+        if dropped is not None:
+            dropped[1].release()
+
+    def _take_next(self):
+        """Pop the pending frame of the next source in round robin order, the lock must be held."""
+        count = len(self._sources)
+        for offset in range(count):
+            index = (self._next_source + offset) % count
+            source = self._sources[index]
+            pending = self._pending.pop(source, None)
+            if pending is not None:
+                self._next_source = (index + 1) % count
+                return source, pending
+        return None, None
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while self.running and not self._pending:
+                    self._condition.wait()
+                if not self.running:
+                    return
+                source, (frame_id, buffer, submitted_at) = self._take_next()
+                decoder = self._decoders[source]
+                self._busy += 1
+
+            frame = buffer.array
+            try:
+                with metrics.timer('decode'):
+                    codes = decoder(frame)
+            except Exception as e:
+                log.exception("Error in decode worker: %s", e)
+                codes = []
+            finally:
+                buffer.release()
+            latency = time.perf_counter() - submitted_at
+
+            metrics.observe('decode.latency', latency * 1000)
+            with self._condition:
+                self._busy -= 1
+                stats = self._stats[source]
+                stats.frames_decoded += 1
+                stats.last_latency = latency
+                stats.max_latency = max(stats.max_latency, latency)
+                stats.total_latency += latency
+            self.codes_decoded.emit(
+                DecodeResult(frame_id, codes, latency, (frame.shape[1], frame.shape[0]), source))
+
+    def queue_depth(self):
+        """Frames being decoded plus the ones waiting for a worker."""
+        with self._condition:
+            return self._busy + len(self._pending)
+
+    def stats(self, source=None):
+        """Counters of one source, or summed over all of them."""
+        with self._condition:
+            if source is not None:
+                return self._stats[source].as_dict()
+            total = SourceStats()
+            for stats in self._stats.values():
+                total.frames_submitted += stats.frames_submitted
+                total.frames_dropped += stats.frames_dropped
+                total.frames_decoded += stats.frames_decoded
+                total.last_latency = max(total.last_latency, stats.last_latency)
+                total.max_latency = max(total.max_latency, stats.max_latency)
+                total.total_latency += stats.total_latency
+            return total.as_dict()
+
+    def stop(self):
+        with self._condition:
+            self.running = False
+            pending, self._pending = self._pending, {}
+            self._condition.notify_all()
+        for _, buffer, _ in pending.values():
+            buffer.release()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
@@ -0,0 +1,128 @@
+import itertools
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from PyQt5.QtCore import QObject, pyqtSignal
+from requests.adapters import HTTPAdapter
+
+from src.AssetCache import DOWNLOAD_HEADERS
+
+log = logging.getLogger(__name__)
+
+
+class DownloadJob:
+    def __init__(self, job_id, url):
+        self.id = job_id
+        self.url = url
+        self.cancelled = threading.Event()
+        self.finished = False
+
+
+class DownloadManager(QObject):
+    """Streams datasheets and images into the asset cache on a small worker pool.
+
+    request() is for what the user is looking at: it cancels the previous
+    request and only the most recent one ever emits download_finished.
+    prefetch() fills the cache in the background without emitting anything.
+    Cancellation is cooperative, workers check it between chunks and never get
+    killed mid-request.
+    """
+    # Job id, URL and local path of the finished download, the path is empty on failure
+    download_finished = pyqtSignal(int, str, str)
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, cache, workers=3, timeout=10):
+        super().__init__()
+        self.cache = cache
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(DOWNLOAD_HEADERS)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="download")
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._current = None
+        self._prefetching = set()
+        self._closed = threading.Event()
+
+    def request(self, url):
+        """Download a URL for display, superseding the previous request. Returns the job id."""
+        with self._lock:
+            previous = self._current
+            if previous is not None and previous.url == url and not previous.finished \
+                    and not previous.cancelled.is_set():
+                return previous.id  # Already on its way
+            job = DownloadJob(next(self._ids), url)
+            self._current = job
+        if previous is not None:
+            previous.cancelled.set()
+
+        if not url:
+            self.download_finished.emit(job.id, "", "")
+            return job.id
+        cached_path = self.cache.get(url)
+        if cached_path is not None:
+            self.download_finished.emit(job.id, url, cached_path)
+            return job.id
+        self.executor.submit(self._run, job, True)
+        return job.id
+
+    def prefetch(self, *urls):
+        for url in urls:
+            if not url or not url.startswith("http") or self.cache.get(url) is not None:
+                continue
+            with self._lock:
+                if url in self._prefetching:
+                    continue
+                self._prefetching.add(url)
+            self.executor.submit(self._run, DownloadJob(0, url), False)
+
+    def is_current(self, job_id):
+        with self._lock:
+            return self._current is not None and self._current.id == job_id
+
+    def _run(self, job, notify):
+        path = ""
+        try:
+            if not job.cancelled.is_set():
+                path = self.cache.get(job.url) or self._stream(job) or ""
+        except (requests.RequestException, OSError) as e:
+            log.warning("Download failed for %s: %s", job.url, e)
+        finally:
+            job.finished = True
+            if not notify:
+                with self._lock:
+                    self._prefetching.discard(job.url)
+        if notify and not job.cancelled.is_set() and self.is_current(job.id):
+            self.download_finished.emit(job.id, job.url, path)
+
+    def _stream(self, job):
+        """Stream a download to a temporary file in chunks, None if it was cancelled."""
+        fd, temp_path = tempfile.mkstemp(dir=self.cache.directory, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as file, \
+                    self.session.get(job.url, stream=True, timeout=self.timeout) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(self.CHUNK_SIZE):
+                    if job.cancelled.is_set() or self._closed.is_set():
+                        return None
+                    file.write(chunk)
+            return self.cache.put_file(job.url, temp_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def close(self):
+        self._closed.set()
+        with self._lock:
+            if self._current is not None:
+                self._current.cancelled.set()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
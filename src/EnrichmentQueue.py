@@ -0,0 +1,211 @@
+"""Background lookup of stored parts Mouser has not answered for yet.
+
+Parts scanned while offline, or whose lookup failed, are stored with just their
+part number and quantity. This job finds them in the store, resolves them in
+bulk through the shared PartLookup and fills in their rows in place, so scanning
+never waits on the network. Found parts due a refresh and not found parts due
+a retry are picked up the same way.
+
+    MOUSER_API_URL=http://127.0.0.1:8765/api/v1 python main.py enrich
+"""
+import argparse
+import logging
+import random
+import threading
+import time
+from collections import deque
+from functools import partial
+
+from src import Config
+from src.Logger import setup_logging
+from src.Metrics import metrics
+
+log = logging.getLogger(__name__)
+
+
+class EnrichmentQueue:
+    """Resolves unresolved and stale parts with bounded concurrency and exponential backoff.
+
+    At most `max_in_flight` part numbers are outstanding at once; PartLookup
+    batches them into requests and its rate limiter, which also honours
+    Retry-After, is shared with interactive lookups. A failed lookup puts its
+    part on a per part backoff and pauses the whole queue, doubling each time
+    up to `backoff_max`, so an unreachable API is probed rather than hammered.
+    With `max_attempts` set, a part failing that many times is left for a later run.
+    """
+
+    def __init__(self, store, lookup, journal=None, max_in_flight=Config.ENRICH_MAX_IN_FLIGHT,
+                 poll_interval=Config.ENRICH_POLL_INTERVAL, backoff_base=Config.ENRICH_BACKOFF_BASE,
+                 backoff_max=Config.ENRICH_BACKOFF_MAX, refresh_after=Config.LOOKUP_CACHE_TTL,
+                 retry_after=Config.LOOKUP_NEGATIVE_TTL, max_attempts=None, clock=time.monotonic):
+        self.store = store
+        self.lookup = lookup
+        self.journal = journal
+        self.max_in_flight = max_in_flight
+        self.poll_interval = poll_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.refresh_after = refresh_after
+        self.retry_after = retry_after
+        self.max_attempts = max_attempts
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self.idle = threading.Event()  # Set while there is nothing left that could be looked up now
+        self._in_flight = set()
+        self._retry_at = {}  # Part number -> (failures, clock time of the next attempt)
+        self._failures = 0  # Consecutive failed pauses of the whole queue
+        self._paused_until = 0.0
+        self._completed = deque()  # Clock times of answers in the last minute
+        self.backlog = 0
+        self.resolved = 0
+        self.not_found = 0
+        self.failed = 0
+        self.running = False
+        self._thread = None
+
+    def start(self):
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name="enrichment", daemon=True)
+        self._thread.start()
+
+    def notify(self):
+        """Tell the queue a part needing a lookup was stored, instead of waiting for the next poll."""
+        self._wake.set()
+
+    def _run(self):
+        while self.running:
+            # Cleared before looking, so a wake up during the step isn't lost
+            self._wake.clear()
+            try:
+                wait = self._step()
+            except Exception as e:
+                log.exception("Error in enrichment queue: %s", e)
+                wait = self.poll_interval
+            if wait:
+                self._wake.wait(wait)
+
+    def _step(self):
+        """Send out as many lookups as there are free slots, returns how long to sleep."""
+        now = self.clock()
+        with self._lock:
+            if now < self._paused_until:
+                return self._paused_until - now
+            free = self.max_in_flight - len(self._in_flight)
+            skip = self._in_flight | {mpn for mpn, (_, at) in self._retry_at.items() if at > now}
+        wall = time.time()
+        refresh_before, retry_before = wall - self.refresh_after, wall - self.retry_after
+        self.backlog = self.store.unresolved_count(refresh_before, retry_before)
+        metrics.gauge('enrich.backlog', self.backlog)
+        if free <= 0:
+            return self.poll_interval  # Woken as soon as a lookup finishes
+        part_numbers = self.store.unresolved_parts(refresh_before, retry_before, free, skip)
+        if not part_numbers:
+            with self._lock:
+                # Parts backing off still have attempts left, so the queue isn't done until they're tried
+                waiting = [at for _, at in self._retry_at.values() if now < at < float('inf')]
+                if not self._in_flight and not waiting:
+                    self.idle.set()
+            return min([self.poll_interval] + [at - now for at in waiting])
+        self.idle.clear()
+        with self._lock:
+            self._in_flight.update(part_numbers)
+        for part_number in part_numbers:
+            self.lookup.lookup(part_number).add_done_callback(partial(self._done, part_number))
+        return 0
+
+    def _backoff(self, failures):
+        delay = min(self.backoff_max, self.backoff_base * 2 ** failures)
+        return delay * random.uniform(0.5, 1.0)  # Jitter, so retries don't line up
+
+    def _done(self, part_number, future):
+        state, info = future.result()
+        now = self.clock()
+        if state is None:
+            with self._lock:
+                self._in_flight.discard(part_number)
+                failures, _ = self._retry_at.get(part_number, (0, 0.0))
+                if self.max_attempts and failures + 1 >= self.max_attempts:
+                    self._retry_at[part_number] = (failures + 1, float('inf'))
+                else:
+                    self._retry_at[part_number] = (failures + 1, now + self._backoff(failures))
+                # A batch fails as a whole, only the first failure after a pause extends it
+                if now >= self._paused_until:
+                    self._paused_until = now + self._backoff(self._failures)
+                    self._failures += 1
+                self.failed += 1
+            metrics.count('enrich.failures')
+            self._wake.set()
+            return
+
+        self.store.update_part_info(part_number, info)
+        if self.journal is not None:
+            self.journal.record_enrichment(part_number, info)
+        with self._lock:
+            self._in_flight.discard(part_number)
+            self._retry_at.pop(part_number, None)
+            self._failures = 0
+            self._completed.append(now)
+            if state:
+                self.resolved += 1
+            else:
+                self.not_found += 1
+        metrics.count('enrich.resolved' if state else 'enrich.not_found')
+        self._wake.set()
+
+    def stats(self):
+        """Backlog, lookups outstanding, answers per minute and how long the queue is paused for."""
+        now = self.clock()
+        with self._lock:
+            while self._completed and now - self._completed[0] > 60:
+                self._completed.popleft()
+            return {
+                'backlog': self.backlog,
+                'in_flight': len(self._in_flight),
+                'per_minute': len(self._completed),
+                'resolved': self.resolved,
+                'not_found': self.not_found,
+                'failed': self.failed,
+                'paused_for': max(0.0, self._paused_until - now),
+            }
+
+    def stop(self):
+        self.running = False
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="main.py enrich",
+                                     description="Look up every stored part Mouser has not answered for yet")
+    parser.add_argument("--attempts", type=int, default=3, help="lookups to try per part before giving up")
+    args = parser.parse_args(argv)
+    setup_logging()
+
+    from src.InventoryStore import InventoryStore
+    from src.PartLookup import PartLookup
+    from src.ResponseCache import ResponseCache
+    from src.ScanJournal import ScanJournal
+
+    store = InventoryStore(Config.INVENTORY_DB_PATH)
+    journal = ScanJournal(Config.JOURNAL_PATH)
+    journal.recover(store)
+    store.flush()
+    lookup = PartLookup(ResponseCache(Config.LOOKUP_CACHE_PATH, Config.LOOKUP_CACHE_TTL, Config.LOOKUP_NEGATIVE_TTL))
+    queue = EnrichmentQueue(store, lookup, journal, poll_interval=0.5, max_attempts=args.attempts)
+    queue.start()
+    try:
+        # Done once every part is answered or out of attempts
+        queue.idle.wait()
+    finally:
+        queue.stop()
+        lookup.close()
+        journal.close()
+        store.close()
+    stats = queue.stats()
+    log.info("Enriched %d parts, %d not found on Mouser, %d lookups failed.",
+             stats['resolved'], stats['not_found'], stats['failed'])
+    return 0 if not stats['failed'] else 1
@@ -0,0 +1,34 @@
+import logging
+import sqlite3
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from src.Exporter import export_parts
+
+log = logging.getLogger(__name__)
+
+
+class ExportThread(QThread):
+    progress = pyqtSignal(int, int)  # Rows written, rows to write
+    export_finished = pyqtSignal(str, int)  # Path and rows written
+    export_failed = pyqtSignal(str)
+
+    def __init__(self, store, path, incremental=False):
+        super().__init__()
+        self.store = store
+        self.path = path
+        self.incremental = incremental
+        self.cancel_requested = False
+
+    def run(self):
+        try:
+            rows = export_parts(self.store, self.path, self.incremental,
+                                progress=self.progress.emit, cancelled=lambda: self.cancel_requested)
+            if not self.cancel_requested:
+                self.export_finished.emit(self.path, rows)
+        except (OSError, ValueError, sqlite3.Error) as e:
+            log.error("Export failed: %s", e)
+            self.export_failed.emit(str(e))
+
+    def cancel(self):
+        self.cancel_requested = True
@@ -0,0 +1,155 @@
+import csv
+import json
+import os
+import re
+import time
+import zipfile
+from xml.sax.saxutils import escape
+
+from src.InventoryStore import PART_FIELDS
+
+LAST_EXPORT_KEY = 'last_export_at'
+# Characters XML 1.0 does not allow, Excel refuses files containing them
+_ILLEGAL_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+class CsvExportWriter:
+    def __init__(self, path):
+        self.file = open(path, "w", newline='', encoding="utf-8")
+        self.writer = csv.DictWriter(self.file, fieldnames=PART_FIELDS)
+        self.writer.writeheader()
+
+    def write(self, part):
+        self.writer.writerow(part)
+
+    def close(self):
+        self.file.close()
+
+
+class JsonlExportWriter:
+    def __init__(self, path):
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write(self, part):
+        self.file.write(json.dumps(part) + "\n")
+
+    def close(self):
+        self.file.close()
+
+
+class XlsxExportWriter:
+    """Minimal streaming XLSX writer, rows go straight into the zipped sheet XML."""
+
+    CONTENT_TYPES = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    )
+    ROOT_RELS = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    )
+    WORKBOOK = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Inventory" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    )
+    WORKBOOK_RELS = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    )
+
+    def __init__(self, path):
+        self.zip = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED)
+        self.zip.writestr("[Content_Types].xml", self.CONTENT_TYPES)
+        self.zip.writestr("_rels/.rels", self.ROOT_RELS)
+        self.zip.writestr("xl/workbook.xml", self.WORKBOOK)
+        self.zip.writestr("xl/_rels/workbook.xml.rels", self.WORKBOOK_RELS)
+        self.sheet = self.zip.open("xl/worksheets/sheet1.xml", "w", force_zip64=True)
+        self.sheet.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                         b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+        self._write_row(PART_FIELDS)
+
+    @staticmethod
+    def _cell(value):
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return f'<c><v>{value}</v></c>'
+        if value is None:
+            return '<c/>'
+        text = escape(_ILLEGAL_XML.sub('', str(value)))
+        return f'<c t="inlineStr"><is><t>{text}</t></is></c>'
+
+    def _write_row(self, values):
+        self.sheet.write(('<row>' + ''.join(self._cell(v) for v in values) + '</row>').encode("utf-8"))
+
+    def write(self, part):
+        self._write_row([part.get(field) for field in PART_FIELDS])
+
+    def close(self):
+        self.sheet.write(b'</sheetData></worksheet>')
+        self.sheet.close()
+        self.zip.close()
+
+
+WRITERS = {
+    '.csv': CsvExportWriter,
+    '.jsonl': JsonlExportWriter,
+    '.xlsx': XlsxExportWriter,
+}
+
+
+def export_parts(store, path, incremental=False, progress=None, cancelled=None, progress_every=1000):
+    """Stream parts from the store into a CSV, JSONL or XLSX file chosen by extension.
+
+    With `incremental` only parts changed since the last export, full or incremental, are
+    written. `progress(done, total)` is called every `progress_every` rows and
+    `cancelled()` is polled as often. Returns the number of rows written.
+    """
+    writer_class = WRITERS.get(os.path.splitext(path)[1].lower())
+    if writer_class is None:
+        raise ValueError(f"Unsupported export format: {path}")
+
+    started_at = time.time()
+    since = float(store.get_meta(LAST_EXPORT_KEY, 0)) if incremental else None
+    total = store.part_count(since)
+    temp_path = path + ".part"
+    writer = writer_class(temp_path)
+    rows = 0
+    try:
+        for part in store.iter_parts(since):
+            writer.write(part)
+            rows += 1
+            if rows % progress_every == 0:
+                if cancelled is not None and cancelled():
+                    break
+                if progress is not None:
+                    progress(rows, total)
+    finally:
+        writer.close()
+
+    if cancelled is not None and cancelled():
+        os.remove(temp_path)
+        return 0
+    os.replace(temp_path, path)
+    # Full exports count too, so the next one can be incremental. Rows changed
+    # while exporting have a later timestamp and go out next time
+    store.set_meta(LAST_EXPORT_KEY, started_at)
+    if progress is not None:
+        progress(rows, total)
+    return rows
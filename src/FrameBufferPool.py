@@ -0,0 +1,91 @@
+import threading
+
+import numpy as np
+
+
+class FrameBuffer:
+    """A pooled frame array, shared by reference count between capture, decode and display.
+
+    Whoever keeps the frame after the capture thread hands it on calls retain(),
+    and release() once done with it. The array goes back to the pool when the
+    last reference is released.
+    """
+
+    def __init__(self, pool, array):
+        self.pool = pool
+        self.array = array
+        self._refs = 0
+
+    def retain(self):
+        with self.pool.lock:
+            self._refs += 1
+        return self
+
+    def release(self):
+        with self.pool.lock:
+            self._refs -= 1
+            if self._refs == 0 and self.array.shape == self.pool.shape:
+                self.pool._free.append(self)
+
+    @property
+    def shape(self):
+        return self.array.shape
+
+
+class FrameBufferPool:
+    """Preallocated frame arrays reused across frames instead of a fresh 4K array per read."""
+
+    def __init__(self, shape, count=6, dtype=np.uint8):
+        self.shape = tuple(shape)
+        self.dtype = dtype
+        self.lock = threading.Lock()
+        self._free = [FrameBuffer(self, np.empty(self.shape, dtype)) for _ in range(count)]
+        self.allocated = count
+
+    def acquire(self):
+        """Take a free buffer with one reference, allocating only if every buffer is in use."""
+        with self.lock:
+            buffer = self._free.pop() if self._free else None
+            if buffer is None:
+                self.allocated += 1
+        if buffer is None:
+            buffer = FrameBuffer(self, np.empty(self.shape, self.dtype))
+        return buffer.retain()
+
+    def resize(self, shape):
+        """Switch to a new frame shape, buffers still in use are dropped when released."""
+        with self.lock:
+            if tuple(shape) == self.shape:
+                return
+            self.shape = tuple(shape)
+            count = len(self._free)
+            self._free = [FrameBuffer(self, np.empty(self.shape, self.dtype)) for _ in range(count)]
+
+    def wrap(self, array):
+        """Adopt an array that did not come from the pool, e.g. when the camera changed shape."""
+        if array.shape != self.shape:
+            self.resize(array.shape)
+        return FrameBuffer(self, array).retain()
+
+
+class LatestFrame:
+    """Single slot holding the newest frame for a consumer that runs slower than capture."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buffer = None
+        self.dropped = 0
+
+    def put(self, buffer):
+        buffer.retain()
+        with self._lock:
+            old, self._buffer = self._buffer, buffer
+        if old is not None:
+            self.dropped += 1
+            old.release()
+
+    def take(self):
+        """Return the newest frame (the caller releases it) or None if nothing new arrived."""
+        with self._lock:
+            buffer, self._buffer = self._buffer, None
+        return buffer
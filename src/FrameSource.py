@@ -0,0 +1,297 @@
+"""Where camera threads and headless runs get their frames from.
+
+A CAMERA_SOURCES entry, or a --source argument, is one of:
+
+    1                                       camera index
+    rtsp://host/stream                      network stream, read as it arrives
+    clip.mp4  frames/  shots/*.png          recording, replayed in real time and looped
+    clip.mp4?speed=4&loop=0                 replay options: speed (0 or max for as fast as
+                                            frames can be read), fps and loop
+    synthetic?labels=8&dwell=2&fps=30       generated QR labels, also size=1920x1080,
+                                            module (pixels per QR module), seed, frames
+                                            and speed
+
+Recordings and synthetic labels let the whole pipeline run on machines
+without a camera, and the same spec always produces the same frames.
+"""
+import glob
+import logging
+import math
+import os
+import urllib.parse
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from src.CaptureGovernor import CaptureGovernor
+
+log = logging.getLogger(__name__)
+
+BACKENDS = {
+    'any': cv2.CAP_ANY,
+    'dshow': cv2.CAP_DSHOW,
+    'msmf': cv2.CAP_MSMF,
+    'v4l2': cv2.CAP_V4L2,
+    'ffmpeg': cv2.CAP_FFMPEG,
+    'gstreamer': cv2.CAP_GSTREAMER,
+}
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.webp'}
+
+
+def parse_properties(text):
+    """Turn 'AUTOFOCUS=1,CONTRAST=105' into {cv2.CAP_PROP_AUTOFOCUS: 1.0, ...}."""
+    properties = {}
+    for pair in (text or "").split(','):
+        if '=' not in pair:
+            continue
+        name, value = pair.split('=', 1)
+        prop = getattr(cv2, f"CAP_PROP_{name.strip().upper()}", None)
+        if prop is None:
+            log.warning("Unknown camera property '%s'", name.strip())
+            continue
+        properties[prop] = float(value)
+    return properties
+
+
+class FrameSource:
+    """Frames on demand, read() follows cv2.VideoCapture.read and fills `out` when the shape matches.
+
+    Only live cameras have their resolution and rate managed by the capture
+    thread; other sources pace themselves in read(). `ended` turns True once
+    a source that doesn't loop has nothing left.
+    """
+    live = False
+    ended = False
+
+    def read(self, out=None):
+        raise NotImplementedError
+
+    def set_mode(self, frame_size, fps):
+        pass
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        pass
+
+
+class CameraSource(FrameSource):
+    """A camera device, or a network stream read as fast as it delivers."""
+
+    def __init__(self, source, backend=cv2.CAP_ANY, fourcc=None, properties=None):
+        self.live = isinstance(source, int)
+        self.cap = cv2.VideoCapture(source, backend if self.live else cv2.CAP_ANY)
+        if fourcc:
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+        for prop, value in (properties or {}).items():
+            self.cap.set(prop, value)
+
+    def read(self, out=None):
+        return self.cap.read(out)
+
+    def set_mode(self, frame_size, fps):
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, frame_size[0])
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, frame_size[1])
+        self.cap.set(cv2.CAP_PROP_FPS, fps)
+
+    def set(self, prop, value):
+        return self.cap.set(prop, value)
+
+    def release(self):
+        self.cap.release()
+
+
+class ReplaySource(FrameSource):
+    """A video file, or the images of a directory or glob pattern in name order, played back.
+
+    Videos play at their own frame rate and image sequences at `fps`, times
+    `speed`; a speed of 0 reads frames as fast as they decode. With `loop`
+    the recording starts over at the end.
+    """
+
+    def __init__(self, path, speed=1.0, fps=None, loop=True):
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        self.position = 0  # Frames read since the last rewind
+        self.loops = 0
+        self._governor = CaptureGovernor(0)
+        self.cap = None
+        self.images = None
+        if os.path.isdir(path):
+            self.images = sorted(os.path.join(path, name) for name in os.listdir(path)
+                                 if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS)
+        elif glob.has_magic(path):
+            self.images = sorted(glob.glob(path))
+        if self.images is not None:
+            if not self.images:
+                raise ValueError(f"No images in {path}")
+            self.fps = fps or 30.0
+        else:
+            self.cap = cv2.VideoCapture(path)
+            if not self.cap.isOpened():
+                raise ValueError(f"Could not open {path}")
+            self.fps = fps or self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    def _read_next(self, out):
+        if self.cap is not None:
+            return self.cap.read(out)
+        if self.position >= len(self.images):
+            return False, None
+        frame = cv2.imread(self.images[self.position], cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError(f"Could not read image {self.images[self.position]}")
+        if out is not None and out.shape == frame.shape:
+            np.copyto(out, frame)
+            return True, out
+        return True, frame
+
+    def read(self, out=None):
+        if self.ended:
+            return False, None
+        self._governor.pace(self.fps * self.speed)
+        ok, frame = self._read_next(out)
+        if not ok:
+            # An empty recording would loop forever without ever returning a frame
+            if not self.loop or not self.position:
+                self.ended = True
+                return False, None
+            self.position = 0
+            self.loops += 1
+            if self.cap is not None:
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self._read_next(out)
+        self.position += 1
+        return ok, frame
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+
+
+class SyntheticSource(FrameSource):
+    """Labels with brace QR payloads drifting across a textured background, rendered frame by frame.
+
+    `labels` are in view at a time, spread over lanes, each crossing the frame
+    in `dwell` seconds of source time. As a label leaves, one with the next part
+    number enters, so new codes arrive at about labels / dwell per second.
+    Frame n only depends on n and the seed, whatever the `speed` it is read at.
+    `shown` collects the payloads that have been fully in view, what a perfect
+    decoder would have found.
+    """
+
+    def __init__(self, size=(1280, 720), labels=4, fps=30.0, dwell=2.0, speed=1.0, module_px=4, seed=0,
+                 frames=None):
+        self.size = size
+        self.labels = labels
+        self.fps = fps
+        self.dwell = dwell
+        self.speed = speed
+        self.module_px = module_px
+        self.seed = seed
+        self.frames = frames
+        self.index = 0
+        self.shown = set()
+        self._governor = CaptureGovernor(0)
+        self._encoder = cv2.QRCodeEncoder.create()
+        self._codes = OrderedDict()  # Payload -> rendered label, least recently used first
+        width, height = size
+        rng = np.random.default_rng(seed)
+        self._background = np.full((height, width, 3), 190, np.uint8)
+        self._background += rng.integers(0, 7, self._background.shape, dtype=np.uint8)
+        self.label_size = max(self._label(self.payload(n)).shape[0] for n in range(labels))
+        self.lanes = max(1, min(labels, height // self.label_size))
+        self.per_lane = math.ceil(labels / self.lanes)
+        if self.per_lane * self.label_size > width:
+            log.warning("%d labels per lane don't fit across %dpx, they will overlap", self.per_lane, width)
+
+    def payload(self, number):
+        return f"{{pm:SIM-{self.seed}-{number:06d},qty:{number % 100 + 1}}}"
+
+    def _label(self, payload):
+        label = self._codes.get(payload)
+        if label is None:
+            code = self._encoder.encode(payload)
+            code = cv2.resize(code, None, fx=self.module_px, fy=self.module_px, interpolation=cv2.INTER_NEAREST)
+            quiet = 4 * self.module_px
+            label = cv2.copyMakeBorder(code, quiet, quiet, quiet, quiet, cv2.BORDER_CONSTANT, value=255)
+            self._codes[payload] = label
+            if len(self._codes) > 2 * self.labels:
+                self._codes.popitem(last=False)
+        else:
+            self._codes.move_to_end(payload)
+        return label
+
+    def placements(self, index):
+        """(payload, x, y) of every label in frame `index`, x and y of its top left corner."""
+        width, height = self.size
+        lane_height = height // self.lanes
+        t = index / self.fps
+        for slot in range(self.labels):
+            position, lane = divmod(slot, self.lanes)
+            # Labels in a lane are evenly spaced, lanes are staggered so they don't enter together
+            phase = t / self.dwell + position / self.per_lane + lane / (self.lanes * self.per_lane)
+            x = int(-self.label_size + (width + self.label_size) * (phase % 1.0))
+            y = lane * lane_height + (lane_height - self.label_size) // 2
+            yield self.payload(int(phase) * self.labels + slot), x, y
+
+    def read(self, out=None):
+        if self.frames is not None and self.index >= self.frames:
+            self.ended = True
+            return False, None
+        self._governor.pace(self.fps * self.speed)
+        width, height = self.size
+        frame = out if out is not None and out.shape == self._background.shape else np.empty_like(self._background)
+        np.copyto(frame, self._background)
+        for payload, x, y in self.placements(self.index):
+            label = self._label(payload)
+            h, w = label.shape
+            left, right = max(x, 0), min(x + w, width)
+            if right <= left:
+                continue
+            if left == x and right == x + w:
+                self.shown.add(payload)
+            frame[y:y + h, left:right] = label[:, left - x:right - x, None]
+        self.index += 1
+        return True, frame
+
+
+SOURCE_OPTIONS = {
+    'speed': lambda value: 0.0 if value == 'max' else float(value),
+    'fps': float,
+    'loop': lambda value: value.lower() not in ('0', 'false', 'no'),
+    'labels': int,
+    'dwell': float,
+    'module': int,
+    'seed': int,
+    'frames': int,
+    'size': lambda value: tuple(int(part) for part in value.lower().split('x')),
+}
+
+
+def open_source(spec, backend='any', fourcc=None, properties=None):
+    """Open the frame source a spec describes, see the module docstring."""
+    spec = str(spec).strip()
+    if spec.isdigit():
+        return CameraSource(int(spec), BACKENDS.get(str(backend).lower(), cv2.CAP_ANY), fourcc, properties)
+    if '://' in spec:
+        return CameraSource(spec)
+
+    target, _, query = spec.partition('?')
+    options = {}
+    for name, value in urllib.parse.parse_qsl(query):
+        if name not in SOURCE_OPTIONS:
+            raise ValueError(f"Unknown frame source option '{name}', expected one of {', '.join(SOURCE_OPTIONS)}")
+        options[name] = SOURCE_OPTIONS[name](value)
+    if target == 'synthetic':
+        if 'loop' in options:
+            raise ValueError("Synthetic sources don't loop, give frames= to end them")
+        if 'module' in options:
+            options['module_px'] = options.pop('module')
+        return SyntheticSource(**options)
+    unsupported = set(options) - {'speed', 'fps', 'loop'}
+    if unsupported:
+        raise ValueError(f"Replay sources don't take {', '.join(sorted(unsupported))}")
+    return ReplaySource(target, **options)
@@ -0,0 +1,355 @@
+"""Headless batch scanning of images, videos and directories, no Qt involved.
+
+    python main.py scan shelf_photos/ reel.mp4 --format jsonl --output parts.jsonl
+    python main.py scan --source "synthetic?labels=8&speed=max" --frames 900 --output /dev/null
+
+Files are decoded in parallel across processes. Every distinct code found is
+parsed, optionally looked up on Mouser and stored, and streamed out as JSONL
+or CSV as soon as it is ready. With --source frames come from a camera,
+recording or synthetic FrameSource instead, played like a live camera, and a
+throughput and latency summary is logged at the end.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import cv2
+
+from src import Config
+from src.CodeDeduplicator import KNOWN, NEW
+from src.FrameSource import IMAGE_EXTENSIONS, open_source
+from src.Logger import setup_logging
+from src.Metrics import metrics
+from src.RoiDecoder import RoiDecoder
+from src.Utils import extract_part_data, make_part
+
+log = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.webm', '.m4v'}
+OUTPUT_FIELDS = ['source', 'frame', 'type', 'data', 'found',
+                 'PartNumber', 'Quantity', 'Description', 'DataSheet', 'ImagePath']
+
+
+def collect_inputs(paths):
+    """Expand directories into the image and video files they contain."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in sorted(names):
+                    if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS | VIDEO_EXTENSIONS:
+                        files.append(os.path.join(root, name))
+        elif os.path.exists(path):
+            files.append(path)
+        else:
+            log.warning("Skipping missing input '%s'", path)
+    return files
+
+
+def plan_tasks(files, segment_frames):
+    """One task per image, videos are split into segments so long clips use several processes."""
+    tasks = []
+    for path in files:
+        if os.path.splitext(path)[1].lower() in VIDEO_EXTENSIONS:
+            cap = cv2.VideoCapture(path)
+            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or segment_frames
+            cap.release()
+            for start in range(0, frame_count, segment_frames):
+                tasks.append(('video', path, start, min(start + segment_frames, frame_count)))
+        else:
+            tasks.append(('image', path, 0, 1))
+    return tasks
+
+
+_image_decoder = None
+_video_decoder = None
+
+
+def _init_worker():
+    global _image_decoder, _video_decoder
+    # Stills have no previous frame to track, so always detect and always try the tiled fallback
+    _image_decoder = RoiDecoder(redetect_every=1, fallback_every=1)
+    _video_decoder = RoiDecoder()
+
+
+def _code_record(path, frame_index, code):
+    return {'source': path, 'frame': frame_index, 'type': code.type,
+            'data': code.data.decode('utf-8', errors='replace')}
+
+
+def scan_task(task, stride=1):
+    """Decode one task in a worker process, returning one record per distinct code."""
+    kind, path, start, end = task
+    records = {}
+    if kind == 'image':
+        frame = cv2.imread(path, cv2.IMREAD_COLOR)
+        if frame is None:
+            log.warning("Could not read image '%s'", path)
+            return []
+        for code in _image_decoder.decode(frame):
+            records.setdefault(code.data, _code_record(path, 0, code))
+        return list(records.values())
+
+    cap = cv2.VideoCapture(path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    for frame_index in range(start, end):
+        if not cap.grab():
+            break
+        if (frame_index - start) % stride:
+            continue
+        ok, frame = cap.retrieve()
+        if not ok:
+            break
+        for code in _video_decoder.decode(frame):
+            records.setdefault(code.data, _code_record(path, frame_index, code))
+    cap.release()
+    return list(records.values())
+
+
+class HeadlessScanner:
+    """Runs the decode, parse, lookup and store steps of the app over files."""
+
+    def __init__(self, workers=None, stride=1, segment_frames=300, store=None, lookup=None, journal=None):
+        self.workers = workers or os.cpu_count()
+        self.stride = stride
+        self.segment_frames = segment_frames
+        self.store = store
+        self.lookup = lookup
+        self.journal = journal
+        self.stats = None  # Throughput and latency of the last scan_source
+        self.latencies = []  # Capture to decoded milliseconds of each of its codes
+
+    def scan(self, paths):
+        """Yield one output record per distinct code, in the order they finish decoding."""
+        tasks = plan_tasks(collect_inputs(paths), self.segment_frames)
+        seen = set()
+        pending = []
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker) as executor:
+            futures = [executor.submit(scan_task, task, self.stride) for task in tasks]
+            for future in as_completed(futures):
+                for record in future.result():
+                    # The same reel can show up in several photos or frames, it counts once
+                    if record['data'] in seen:
+                        continue
+                    seen.add(record['data'])
+                    pending.append(self._resolve(record))
+                pending = yield from self._ready(pending)
+        for record, lookup in pending:
+            yield self._finish(record, lookup.result() if lookup else None)
+
+    def scan_source(self, source, name, frames=None):
+        """Yield one output record per distinct code in the frames of a FrameSource.
+
+        Frames are read as the source delivers them and decoded on `workers`
+        threads, each with its own decoder. At most two frames per worker are
+        in flight, so a source faster than decoding is held back rather than
+        queued up. `stats` holds the throughput and latency once done.
+        """
+        local = threading.local()
+
+        def decode(frame, index, captured_at):
+            decoder = getattr(local, 'decoder', None)
+            if decoder is None:
+                decoder = local.decoder = RoiDecoder()
+            with metrics.timer('decode'):
+                codes = decoder.decode(frame)
+            return index, captured_at, codes
+
+        seen = set()
+        pending = []
+        in_flight = deque()
+        self.latencies = []
+        read = 0
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="decode") as executor:
+            try:
+                while frames is None or read < frames:
+                    ok, frame = source.read()
+                    if not ok:
+                        if source.ended:
+                            break
+                        time.sleep(0.05)  # Camera or stream not delivering yet
+                        continue
+                    in_flight.append(executor.submit(decode, frame, read, time.perf_counter()))
+                    read += 1
+                    while in_flight and (len(in_flight) >= 2 * self.workers or in_flight[0].done()):
+                        pending.extend(self._new_codes(in_flight.popleft().result(), name, seen))
+                    pending = yield from self._ready(pending)
+            except KeyboardInterrupt:
+                log.info("Stopping after %d frames...", read)  # Endless sources run until Ctrl-C
+            while in_flight:
+                pending.extend(self._new_codes(in_flight.popleft().result(), name, seen))
+        elapsed = time.perf_counter() - started
+        for record, lookup in pending:
+            yield self._finish(record, lookup.result() if lookup else None)
+        self.stats = {
+            'frames': read,
+            'seconds': elapsed,
+            'fps': read / elapsed if elapsed else 0.0,
+            'codes': len(seen),
+            'scans_per_second': len(seen) / elapsed if elapsed else 0.0,
+            'decode_p50': metrics.percentile('decode', 50),
+            'decode_p95': metrics.percentile('decode', 95),
+            'latency_p50': metrics.percentile('scan.latency', 50),
+            'latency_p95': metrics.percentile('scan.latency', 95),
+        }
+        shown = getattr(source, 'shown', None)
+        if shown is not None:
+            # Synthetic sources know which labels were there to be found
+            self.stats['labels_shown'] = len(shown)
+            self.stats['labels_decoded'] = len(shown & {data.decode('utf-8', errors='replace') for data in seen})
+
+    def _new_codes(self, result, name, seen):
+        """Records for the codes of a decoded frame not seen before, with their Mouser lookups started."""
+        index, captured_at, codes = result
+        resolved = []
+        for code in codes:
+            if code.data in seen:
+                continue
+            seen.add(code.data)
+            # Frame captured to code out of the decoder, the first time it is seen
+            latency = (time.perf_counter() - captured_at) * 1000
+            self.latencies.append(latency)
+            metrics.observe('scan.latency', latency)
+            resolved.append(self._resolve(_code_record(name, index, code)))
+        return resolved
+
+    def _resolve(self, record):
+        """Parse a record and start its Mouser lookup, returns (record, future or None)."""
+        if self.store is not None and not self.store.add_code(record['data']):
+            record['known'] = True
+        parsed = extract_part_data(record['data'])
+        if self.journal is not None:
+            self.journal.record_scan(record['data'], record['type'], record['source'],
+                                     KNOWN if record.get('known') else NEW, parsed or None)
+        record['PartNumber'] = parsed.get('pm')
+        record['Quantity'] = parsed.get('qty')
+        if record['PartNumber'] and self.lookup is not None:
+            if self.store is not None and record.get('known'):
+                return record, None
+            return record, self.lookup.lookup(record['PartNumber'])
+        return record, None
+
+    def _ready(self, pending):
+        waiting = []
+        for record, lookup in pending:
+            if lookup is None or lookup.done():
+                yield self._finish(record, lookup.result() if lookup else None)
+            else:
+                waiting.append((record, lookup))
+        return waiting
+
+    def _finish(self, record, lookup_result):
+        part_number = record.get('PartNumber')
+        known = record.pop('known', False)
+        if not part_number:
+            return record
+        info = None
+        if lookup_result is not None:
+            state, info = lookup_result
+            record['found'] = state
+        record.update(make_part(part_number, record['Quantity'], info))
+        # Like the app, new codes are always stored, failed lookups are filled in later by 'main.py enrich'
+        if self.store is not None and not known:
+            part = make_part(part_number, record['Quantity'], info)
+            if self.journal is not None:
+                self.journal.record_part(part, self.store)
+            else:
+                self.store.upsert_part(part)
+        return record
+
+
+class JsonlWriter:
+    def __init__(self, file):
+        self.file = file
+
+    def write(self, record):
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+
+class CsvWriter:
+    def __init__(self, file):
+        self.file = file
+        self.writer = csv.DictWriter(file, fieldnames=OUTPUT_FIELDS, extrasaction='ignore')
+        self.writer.writeheader()
+
+    def write(self, record):
+        self.writer.writerow(record)
+        self.file.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="main.py scan", description="Decode parts from images, videos and directories")
+    parser.add_argument("paths", nargs="*", help="image files, video files or directories")
+    parser.add_argument("--source", help="scan a camera, recording or synthetic frame source instead, "
+                                         "e.g. 'synthetic?labels=8&speed=max' (see src/FrameSource.py)")
+    parser.add_argument("--frames", type=int, help="stop --source after this many frames")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    parser.add_argument("--output", help="file to write to, defaults to stdout")
+    parser.add_argument("--workers", type=int, default=None, help="decode processes, threads with --source, defaults to one per core")
+    parser.add_argument("--stride", type=int, default=1, help="decode every Nth video frame")
+    parser.add_argument("--segment-frames", type=int, default=300, help="video frames per parallel task")
+    parser.add_argument("--lookup", action="store_true", help="look parts up on Mouser")
+    parser.add_argument("--store", action="store_true", help="add parts to the inventory store and scan journal")
+    args = parser.parse_args(argv)
+    if bool(args.paths) == bool(args.source):
+        parser.error("give either paths or --source")
+    setup_logging()
+    source = None
+    if args.source:
+        try:
+            source = open_source(args.source)
+        except ValueError as e:
+            parser.error(str(e))
+
+    store = lookup = journal = None
+    if args.store:
+        from src.InventoryStore import InventoryStore
+        from src.ScanJournal import ScanJournal
+        store = InventoryStore(Config.INVENTORY_DB_PATH)
+        journal = ScanJournal(Config.JOURNAL_PATH)
+        journal.recover(store)
+    if args.lookup:
+        from src.PartLookup import PartLookup
+        from src.ResponseCache import ResponseCache
+        lookup = PartLookup(ResponseCache(Config.LOOKUP_CACHE_PATH, Config.LOOKUP_CACHE_TTL, Config.LOOKUP_NEGATIVE_TTL))
+
+    output = open(args.output, "w", newline='') if args.output else sys.stdout
+    writer = CsvWriter(output) if args.format == "csv" else JsonlWriter(output)
+    scanner = HeadlessScanner(args.workers, args.stride, args.segment_frames, store, lookup, journal)
+    count = 0
+    try:
+        # Logging goes to stderr, stdout only carries records
+        records = scanner.scan_source(source, args.source, args.frames) if source else scanner.scan(args.paths)
+        for record in records:
+            writer.write(record)
+            count += 1
+    finally:
+        if source is not None:
+            source.release()
+        if output is not sys.stdout:
+            output.close()
+        if lookup is not None:
+            lookup.close()
+        if journal is not None:
+            journal.close()
+        if store is not None:
+            store.close()
+    log.info("Decoded %d codes.", count)
+    if source is not None:
+        stats = scanner.stats
+        log.info("%d frames in %.1fs: %.1f frames/s, %.1f new codes/s, decode p50 %.1fms p95 %.1fms, "
+                 "capture to code p50 %.1fms p95 %.1fms", stats['frames'], stats['seconds'], stats['fps'],
+                 stats['scans_per_second'], stats['decode_p50'], stats['decode_p95'],
+                 stats['latency_p50'], stats['latency_p95'])
+        if 'labels_shown' in stats:
+            log.info("%d of the %d labels fully shown were decoded.", stats['labels_decoded'], stats['labels_shown'])
+    return 0
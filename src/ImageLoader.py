@@ -1,30 +1,48 @@
-import time
-from PyQt5.QtCore import QThread, pyqtSignal, QObject
+import logging
+
+from PyQt5.QtCore import pyqtSignal, QObject
 from PyQt5.QtNetwork import QNetworkAccessManager, QNetworkRequest
 from PyQt5.QtGui import QImage
 from PyQt5.QtCore import QUrl
 
+log = logging.getLogger(__name__)
+
 class AsyncImageLoader(QObject):
-    image_loaded = pyqtSignal(QImage)
+    # The URL that was requested and the loaded image, a null QImage on failure
+    image_loaded = pyqtSignal(str, QImage)
 
-    def __init__(self):
+    def __init__(self, cache):
         super().__init__()
+        self.cache = cache
         self.manager = QNetworkAccessManager()
         self.manager.finished.connect(self.on_image_loaded)
 
     def load_image(self, url):
+        if not url:
+            self.image_loaded.emit("", QImage())
+            return
+        cached_path = self.cache.get(url)
+        if cached_path is not None:
+            image = QImage(cached_path)
+            if not image.isNull():
+                self.image_loaded.emit(url, image)
+                return
         request = QNetworkRequest(QUrl(url))
-        self.manager.get(request)
+        reply = self.manager.get(request)
+        reply.setProperty("asset_url", url)
 
     def on_image_loaded(self, reply):
+        url = reply.property("asset_url")
         if reply.error() == 0:  # No error
-            data = reply.readAll()
+            data = bytes(reply.readAll())
             image = QImage()
             if image.loadFromData(data):
-                self.image_loaded.emit(image)
+                self.cache.put(url, data)
+                self.image_loaded.emit(url, image)
             else:
-                print("Loaded data is not a valid image.")
-                self.image_loaded.emit(QImage())  # Emit a blank image on failure
+                log.warning("Loaded data from %s is not a valid image.", url)
+                self.image_loaded.emit(url, QImage())  # Emit a blank image on failure
         else:
-            print(f"Error loading image: {reply.errorString()}")
-            self.image_loaded.emit(QImage())  # Emit a blank image on error
+            log.warning("Error loading image %s: %s", url, reply.errorString())
+            self.image_loaded.emit(url, QImage())  # Emit a blank image on error
+        reply.deleteLater()
@@ -0,0 +1,81 @@
+import logging
+
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+from PyQt5.QtWidgets import QAbstractItemView, QHeaderView, QLabel, QLineEdit, QTableView, QVBoxLayout, QWidget
+
+from src import Config
+from src.InventoryModel import InventoryModel
+
+log = logging.getLogger(__name__)
+
+
+class InventoryBrowser(QWidget):
+    """Searchable, sortable view of the whole inventory with totals for what matches.
+
+    Searching waits for typing to pause, then matches substrings of part numbers
+    and descriptions through the store's index. Parts scanned while the browser
+    is open show up within a second.
+    """
+    part_activated = pyqtSignal(object)  # Part dict of a double clicked row
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent, Qt.Window)
+        self.setWindowTitle("Inventory")
+        self.resize(1000, 700)
+        self.model = InventoryModel(store, parent=self)
+
+        self.searchBox = QLineEdit()
+        self.searchBox.setPlaceholderText("Search part number or description")
+        self.searchBox.setClearButtonEnabled(True)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        # Fixed row heights, so the view never measures rows it isn't showing
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().hide()
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setColumnWidth(0, 220)
+        self.table.setSortingEnabled(True)
+        self.table.sortByColumn(0, Qt.AscendingOrder)
+        self.totalsLabel = QLabel()
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.searchBox)
+        layout.addWidget(self.table)
+        layout.addWidget(self.totalsLabel)
+        self.setLayout(layout)
+
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(Config.INVENTORY_SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self.apply_search)
+        self.searchBox.textChanged.connect(lambda text: self.search_timer.start())
+        self.searchBox.returnPressed.connect(self.apply_search)
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(1000)
+        self.model.totals_changed.connect(self.update_totals)
+        self.table.doubleClicked.connect(self.on_double_clicked)
+        self.update_totals(self.model.rowCount(), self.model.quantity)
+
+    def apply_search(self):
+        self.search_timer.stop()
+        self.model.set_query(self.searchBox.text())
+
+    def refresh(self):
+        if self.isVisible():
+            self.model.refresh()
+
+    def update_totals(self, parts, quantity):
+        self.totalsLabel.setText(f"{parts} parts, {quantity} pieces")
+
+    def on_double_clicked(self, index):
+        part = self.model.part(index.row())
+        if part is not None:
+            self.part_activated.emit(part)
+
+    def showEvent(self, event):
+        # Catch up on anything scanned while hidden straight away rather than on the next tick
+        self.model.refresh()
+        super().showEvent(event)
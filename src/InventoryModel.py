@@ -0,0 +1,112 @@
+import logging
+from collections import OrderedDict
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+
+from src import Config
+
+log = logging.getLogger(__name__)
+
+COLUMNS = ['PartNumber', 'Quantity', 'Description']
+HEADERS = ['Part Number', 'Quantity', 'Description']
+
+
+class InventoryModel(QAbstractTableModel):
+    """Table model over the store's parts, fetched a page at a time as rows scroll into view.
+
+    Only the row count and the most recently viewed pages are held in memory, so
+    the view stays responsive with hundreds of thousands of parts. Filtering and
+    sorting are left to the store's indexes.
+    """
+    totals_changed = pyqtSignal(int, int)  # Parts matching and their total quantity
+
+    def __init__(self, store, page_size=Config.INVENTORY_PAGE_SIZE, max_pages=50, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.query = ""
+        self.sort_column = 0
+        self.descending = False
+        self.quantity = 0
+        self.version = None
+        self._rows = 0
+        self._pages = OrderedDict()  # Page number -> parts, least recently used first
+        self._reload()
+
+    def _reload(self):
+        self.version = self.store.version
+        self._pages.clear()
+        self._rows, self.quantity = self.store.search_totals(self.query)
+        self.totals_changed.emit(self._rows, self.quantity)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._rows
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+        part = self.part(index.row())
+        if part is None:
+            return None
+        value = part[COLUMNS[index.column()]]
+        return "" if value is None else value
+
+    def part(self, row):
+        """The part shown on a row as a dict, fetching its page from the store if it isn't held."""
+        page_number, offset = divmod(row, self.page_size)
+        page = self._pages.get(page_number)
+        if page is None:
+            page = self.store.search_parts(self.query, COLUMNS[self.sort_column], self.descending,
+                                           self.page_size, page_number * self.page_size)
+            self._pages[page_number] = page
+            if len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(page_number)
+        return page[offset] if offset < len(page) else None
+
+    def set_query(self, query):
+        query = query.strip()
+        if query == self.query:
+            return
+        self.beginResetModel()
+        self.query = query
+        self._reload()
+        self.endResetModel()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.beginResetModel()
+        self.sort_column = column
+        self.descending = order == Qt.DescendingOrder
+        self._pages.clear()
+        self.endResetModel()
+
+    def refresh(self):
+        """Pick up parts written since the last fetch, keeping the scroll position. Cheap if there are none."""
+        version = self.store.version
+        if version == self.version:
+            return
+        self.version = version
+        rows, self.quantity = self.store.search_totals(self.query)
+        self._pages.clear()
+        # Rows are only added or removed at the end, the ones on screen are repainted from fresh pages
+        if rows > self._rows:
+            self.beginInsertRows(QModelIndex(), self._rows, rows - 1)
+            self._rows = rows
+            self.endInsertRows()
+        elif rows < self._rows:
+            self.beginRemoveRows(QModelIndex(), rows, self._rows - 1)
+            self._rows = rows
+            self.endRemoveRows()
+        if rows:
+            self.dataChanged.emit(self.index(0, 0), self.index(rows - 1, len(COLUMNS) - 1))
+        self.totals_changed.emit(rows, self.quantity)
@@ -0,0 +1,474 @@
+import csv
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from src.Metrics import metrics
+
+log = logging.getLogger(__name__)
+
+PART_FIELDS = ['PartNumber', 'Quantity', 'Description', 'DataSheet', 'ImagePath']
+# Columns search results can be sorted on, each backed by an index
+SORT_KEYS = {
+    'PartNumber': 'PartNumber',
+    'Quantity': 'Quantity',
+    'Description': 'Description COLLATE NOCASE',
+    'updated_at': 'updated_at',
+}
+
+
+def parse_quantity(qty):
+    try:
+        return int(float(qty))
+    except (TypeError, ValueError):
+        return 0
+
+
+class InventoryStore:
+    """SQLite inventory with one row per part number and a table of every code seen.
+
+    Writes are queued and group-committed by a background writer, reads go
+    straight to the database through the primary key. Writes that are still
+    queued are overlaid on reads so callers always see their own changes.
+    Part writes can carry the seq of their scan journal event, the highest one
+    is committed in the same transaction so replay knows where to start.
+    enriched_at records when Mouser last answered for a part, NULL until it has.
+    Part numbers and descriptions are indexed for substring search by an FTS5
+    trigram table kept in sync by triggers. `version` goes up with every
+    commit so views know when to refresh.
+    """
+
+    def __init__(self, path, batch_window=0.1, batch_size=500):
+        self.path = path
+        self.batch_window = batch_window
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self.version = 0
+        self._conn = self._connect()
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS parts ("
+            " PartNumber TEXT PRIMARY KEY,"
+            " Quantity INTEGER NOT NULL DEFAULT 0,"
+            " Description TEXT,"
+            " DataSheet TEXT,"
+            " ImagePath TEXT,"
+            " updated_at REAL NOT NULL,"
+            " enriched_at REAL);"
+            "CREATE INDEX IF NOT EXISTS parts_updated_at ON parts (updated_at);"
+            "CREATE TABLE IF NOT EXISTS codes ("
+            " code TEXT PRIMARY KEY,"
+            " scanned_at REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS meta ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT);"
+        )
+        self._migrate()
+        self._conn.commit()
+        self._code_count = self._conn.execute("SELECT COUNT(*) FROM codes").fetchone()[0]
+
+        # Writes not yet committed: queued ones and the batch the writer is committing
+        self._pending_codes = set()
+        self._pending_parts = {}
+        self._flushing_codes = set()
+        self._flushing_parts = {}
+        self._pending_journal_seq = None
+        # Failed commits, their batches are queued again and retried with the next write, flush or close
+        self.write_errors = 0
+        self.last_error = None
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="inventory-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL with synchronous=NORMAL only syncs on checkpoints, commits stay cheap
+        conn.execute("PRAGMA synchronous=NORMAL")
+        # So INSERT OR REPLACE fires the delete trigger keeping the search index in sync
+        conn.execute("PRAGMA recursive_triggers=ON")
+        return conn
+
+    def _migrate(self):
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(parts)")}
+        if 'enriched_at' not in columns:
+            self._conn.execute("ALTER TABLE parts ADD COLUMN enriched_at REAL")
+            # Parts with a description were looked up when they were stored
+            self._conn.execute("UPDATE parts SET enriched_at = updated_at WHERE Description IS NOT NULL")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS parts_enriched_at ON parts (enriched_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS parts_quantity ON parts (Quantity)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS parts_description ON parts (Description COLLATE NOCASE)")
+        self.has_search_index = self._create_search_index()
+
+    def _create_search_index(self):
+        """Trigram index over part number and description, False if this SQLite has no FTS5 trigram tokenizer."""
+        if self._conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'parts_fts'").fetchone():
+            return True
+        try:
+            self._conn.executescript(
+                "CREATE VIRTUAL TABLE parts_fts USING fts5("
+                " PartNumber, Description, content='parts', content_rowid='rowid', tokenize='trigram');"
+                "CREATE TRIGGER parts_fts_insert AFTER INSERT ON parts BEGIN"
+                " INSERT INTO parts_fts (rowid, PartNumber, Description)"
+                "  VALUES (new.rowid, new.PartNumber, new.Description);"
+                "END;"
+                "CREATE TRIGGER parts_fts_delete AFTER DELETE ON parts BEGIN"
+                " INSERT INTO parts_fts (parts_fts, rowid, PartNumber, Description)"
+                "  VALUES ('delete', old.rowid, old.PartNumber, old.Description);"
+                "END;"
+                "CREATE TRIGGER parts_fts_update AFTER UPDATE OF PartNumber, Description ON parts"
+                " WHEN old.PartNumber IS NOT new.PartNumber OR old.Description IS NOT new.Description BEGIN"
+                " INSERT INTO parts_fts (parts_fts, rowid, PartNumber, Description)"
+                "  VALUES ('delete', old.rowid, old.PartNumber, old.Description);"
+                " INSERT INTO parts_fts (rowid, PartNumber, Description)"
+                "  VALUES (new.rowid, new.PartNumber, new.Description);"
+                "END;"
+                "INSERT INTO parts_fts (parts_fts) VALUES ('rebuild');"
+            )
+        except sqlite3.OperationalError as e:
+            log.warning("No FTS5 trigram support in SQLite %s (%s), inventory search will scan",
+                        sqlite3.sqlite_version, e)
+            return False
+        return True
+
+    # Reads
+
+    def has_code(self, code):
+        with metrics.timer('store.has_code'), self._lock:
+            return self._has_code(code)
+
+    def _has_code(self, code):
+        if code in self._pending_codes or code in self._flushing_codes:
+            return True
+        return self._conn.execute("SELECT 1 FROM codes WHERE code = ?", (code,)).fetchone() is not None
+
+    def code_count(self):
+        return self._code_count
+
+    def get_part(self, part_number):
+        """Return the stored row for a part number as a dict, or None."""
+        with metrics.timer('store.get_part'), self._lock:
+            row = self._conn.execute(
+                "SELECT PartNumber, Quantity, Description, DataSheet, ImagePath FROM parts WHERE PartNumber = ?",
+                (part_number,)
+            ).fetchone()
+            part = dict(zip(PART_FIELDS, row)) if row else None
+            for pending in (self._flushing_parts, self._pending_parts):
+                if part_number in pending:
+                    part = self._merge(part, pending[part_number])
+        return part
+
+    def part_count(self, since=None):
+        """Number of parts, or of parts changed after the `since` timestamp."""
+        with self._lock:
+            if since is None:
+                return self._conn.execute("SELECT COUNT(*) FROM parts").fetchone()[0]
+            return self._conn.execute("SELECT COUNT(*) FROM parts WHERE updated_at > ?", (since,)).fetchone()[0]
+
+    def iter_parts(self, since=None):
+        """Yield stored parts as dicts, optionally only those changed after `since`.
+
+        Rows stream from a cursor on a separate connection, so memory stays flat
+        however large the inventory is.
+        """
+        self.flush()
+        conn = self._connect()
+        try:
+            if since is None:
+                cursor = conn.execute(
+                    "SELECT PartNumber, Quantity, Description, DataSheet, ImagePath FROM parts ORDER BY PartNumber"
+                )
+            else:
+                cursor = conn.execute(
+                    "SELECT PartNumber, Quantity, Description, DataSheet, ImagePath FROM parts"
+                    " WHERE updated_at > ? ORDER BY updated_at", (since,)
+                )
+            for row in cursor:
+                yield dict(zip(PART_FIELDS, row))
+        finally:
+            conn.close()
+
+    def unresolved_parts(self, refresh_before, retry_before, limit=100, exclude=()):
+        """Part numbers to look up again, never answered ones first.
+
+        That is parts Mouser never answered for, found parts last looked up before
+        `refresh_before` and not found ones last looked up before `retry_before`.
+        """
+        query = ("SELECT PartNumber FROM parts WHERE enriched_at IS NULL OR enriched_at < ?"
+                 " OR (Description IS NULL AND enriched_at < ?) ORDER BY enriched_at IS NOT NULL, updated_at LIMIT ?")
+        with self._lock:
+            rows = self._conn.execute(query, (refresh_before, retry_before, limit + len(exclude))).fetchall()
+        return [row[0] for row in rows if row[0] not in exclude][:limit]
+
+    def unresolved_count(self, refresh_before, retry_before):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM parts WHERE enriched_at IS NULL OR enriched_at < ?"
+                " OR (Description IS NULL AND enriched_at < ?)", (refresh_before, retry_before)
+            ).fetchone()[0]
+
+    def _search_filter(self, query):
+        """WHERE clause and parameters for parts whose number or description contains `query`."""
+        query = query.strip()
+        if not query:
+            return "", ()
+        # Trigrams need three characters, shorter queries match plenty of rows by scanning anyway
+        if self.has_search_index and len(query) >= 3:
+            return (" WHERE rowid IN (SELECT rowid FROM parts_fts WHERE parts_fts MATCH ?)",
+                    ('"' + query.replace('"', '""') + '"',))
+        pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        return " WHERE PartNumber LIKE ? ESCAPE '\\' OR Description LIKE ? ESCAPE '\\'", (pattern, pattern)
+
+    def search_parts(self, query="", sort='PartNumber', descending=False, limit=100, offset=0):
+        """One page of the parts whose number or description contains `query`, case insensitive."""
+        where, params = self._search_filter(query)
+        # rowid breaks ties so pages don't overlap, the sort indexes already end with it
+        direction = 'DESC' if descending else 'ASC'
+        order = f"{SORT_KEYS[sort]} {direction}, rowid {direction}"
+        with metrics.timer('store.search'), self._lock:
+            rows = self._conn.execute(
+                f"SELECT PartNumber, Quantity, Description, DataSheet, ImagePath FROM parts{where}"
+                f" ORDER BY {order} LIMIT ? OFFSET ?", params + (limit, offset)
+            ).fetchall()
+        return [dict(zip(PART_FIELDS, row)) for row in rows]
+
+    def search_totals(self, query=""):
+        """(number of parts, total quantity) matching `query`."""
+        where, params = self._search_filter(query)
+        with self._lock:
+            count, quantity = self._conn.execute(
+                f"SELECT COUNT(*), TOTAL(Quantity) FROM parts{where}", params).fetchone()
+        return count, int(quantity)
+
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    # Writes
+
+    @staticmethod
+    def _merge(existing, part):
+        """Upsert semantics: quantities add up, known fields are never overwritten with None."""
+        if existing is None:
+            merged = {field: part.get(field) for field in PART_FIELDS}
+            merged['Quantity'] = parse_quantity(part.get('Quantity'))
+            return merged
+        merged = dict(existing)
+        merged['Quantity'] = parse_quantity(existing.get('Quantity')) + parse_quantity(part.get('Quantity'))
+        for field in ('Description', 'DataSheet', 'ImagePath'):
+            if part.get(field) is not None:
+                merged[field] = part.get(field)
+        return merged
+
+    def add_code(self, code):
+        """Record a scanned code, returns False if it was already known."""
+        with metrics.timer('store.has_code'), self._lock:
+            if self._has_code(code):
+                return False
+            self._pending_codes.add(code)
+            self._code_count += 1
+        self._queue.put(True)
+        return True
+
+    def upsert_part(self, part, journal_seq=None):
+        """Add a part, or add its quantity to the part already stored under its number."""
+        part_number = part['PartNumber']
+        with self._lock:
+            if journal_seq is not None:
+                self._pending_journal_seq = max(journal_seq, self._pending_journal_seq or 0)
+            pending = self._pending_parts.get(part_number)
+            if pending is None:
+                self._pending_parts[part_number] = {field: part.get(field) for field in PART_FIELDS}
+            else:
+                self._pending_parts[part_number] = self._merge(pending, part)
+        self._queue.put(True)
+
+    def update_part_info(self, part_number, info, replay=False):
+        """Fill in a stored part's Mouser info in place, quantity untouched. info is None if Mouser has no match.
+
+        A replayed update leaves a part that is already enriched with the same info alone.
+        """
+        info = info or {}
+        values = (info.get('Description'), info.get('DataSheet'), info.get('ImagePath'))
+        now = time.time()
+        sql = ("UPDATE parts SET"
+               " Description = COALESCE(?, Description),"
+               " DataSheet = COALESCE(?, DataSheet),"
+               " ImagePath = COALESCE(?, ImagePath),"
+               " updated_at = ?, enriched_at = ? WHERE PartNumber = ?")
+        params = values + (now, now, part_number)
+        if replay:
+            # Otherwise every restart would bump updated_at and export the part again
+            sql += (" AND (enriched_at IS NULL"
+                    " OR Description IS NOT COALESCE(?, Description)"
+                    " OR DataSheet IS NOT COALESCE(?, DataSheet)"
+                    " OR ImagePath IS NOT COALESCE(?, ImagePath))")
+            params += values
+        with self._lock, self._conn:
+            # updated_at moves too, so enriched parts go out with the next incremental export
+            if self._conn.execute(sql, params).rowcount:
+                self.version += 1
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._commit_pending()
+                return
+            # Give more writes a chance to join this transaction, unless someone is waiting on a flush
+            deadline = time.monotonic() + self.batch_window
+            stop = False
+            waiters = [item] if isinstance(item, threading.Event) else []
+            while not waiters and len(self._pending_parts) + len(self._pending_codes) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+            error = self._commit_pending()
+            for waiter in waiters:
+                waiter.error = error
+                waiter.set()
+            if stop:
+                return
+
+    def _commit_pending(self):
+        """Commit everything queued in one transaction, returns the sqlite3.Error if that failed."""
+        with self._lock:
+            self._flushing_codes, self._pending_codes = self._pending_codes, set()
+            self._flushing_parts, self._pending_parts = self._pending_parts, {}
+            journal_seq, self._pending_journal_seq = self._pending_journal_seq, None
+            codes = self._flushing_codes
+            parts = self._flushing_parts
+        if not codes and not parts:
+            return None
+
+        now = time.time()
+        error = None
+        try:
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO codes (code, scanned_at) VALUES (?, ?)",
+                    [(code, now) for code in codes]
+                )
+                self._conn.executemany(
+                    "INSERT INTO parts (PartNumber, Quantity, Description, DataSheet, ImagePath, updated_at, enriched_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT(PartNumber) DO UPDATE SET"
+                    "  Quantity = Quantity + excluded.Quantity,"
+                    "  Description = COALESCE(excluded.Description, Description),"
+                    "  DataSheet = COALESCE(excluded.DataSheet, DataSheet),"
+                    "  ImagePath = COALESCE(excluded.ImagePath, ImagePath),"
+                    "  updated_at = excluded.updated_at,"
+                    "  enriched_at = COALESCE(excluded.enriched_at, enriched_at)",
+                    [(p['PartNumber'], parse_quantity(p['Quantity']), p['Description'], p['DataSheet'],
+                      p['ImagePath'], now, now if p['Description'] is not None else None)
+                     for p in parts.values()]
+                )
+                if journal_seq is not None:
+                    self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('journal_seq', ?)",
+                                       (str(journal_seq),))
+        except sqlite3.Error as e:
+            error = e
+            log.error("Error writing to inventory store, keeping %d codes and %d parts for the next attempt: %s",
+                      len(codes), len(parts), e)
+            metrics.count('store.write_errors')
+        finally:
+            with self._lock:
+                if error is not None:
+                    self.write_errors += 1
+                    self.last_error = error
+                    # Back in the queue ahead of anything written since, so quantities still add up in order
+                    self._pending_codes |= codes
+                    requeued = dict(parts)
+                    for part_number, pending in self._pending_parts.items():
+                        failed = requeued.get(part_number)
+                        requeued[part_number] = pending if failed is None else self._merge(failed, pending)
+                    self._pending_parts = requeued
+                    if journal_seq is not None:
+                        self._pending_journal_seq = max(journal_seq, self._pending_journal_seq or 0)
+                self._flushing_codes = set()
+                self._flushing_parts = {}
+                self.version += 1
+        return error
+
+    def flush(self):
+        """Block until every write queued so far is committed, raises the sqlite3.Error if the commit failed."""
+        done = threading.Event()
+        done.error = None
+        self._queue.put(done)
+        done.wait()
+        if done.error is not None:
+            raise done.error
+
+    def close(self):
+        self._queue.put(None)
+        self._writer.join()
+        with self._lock:
+            self._conn.close()
+
+    # One-time import of the old CSV files
+
+    def import_csv(self, codes_path="uniquecodes.csv", components_path="components.csv"):
+        """Import uniquecodes.csv and components.csv once, later calls do nothing."""
+        with self._lock:
+            done = self._conn.execute("SELECT value FROM meta WHERE key = 'csv_imported'").fetchone()
+        if done or not (os.path.exists(codes_path) or os.path.exists(components_path)):
+            return 0
+
+        log.info("Importing CSV inventory into the local store...")
+        codes = []
+        if os.path.exists(codes_path):
+            with open(codes_path, mode="r", newline='') as file:
+                reader = csv.reader(file)
+                next(reader, None)  # Skip header
+                codes = [(row[0], time.time()) for row in reader if row]
+
+        parts = {}
+        if os.path.exists(components_path):
+            with open(components_path, mode="r", newline='') as file:
+                reader = csv.reader(file)
+                header = next(reader, None) or []
+                for row in reader:
+                    if not row:
+                        continue
+                    if len(row) == len(PART_FIELDS):
+                        # Rows appended after the header were written in PART_FIELDS order
+                        part = dict(zip(PART_FIELDS, row))
+                    else:
+                        part = dict(zip(header, row))
+                    part = {field: (part.get(field) or None) for field in PART_FIELDS}
+                    part_number = part['PartNumber']
+                    if part_number:
+                        parts[part_number] = self._merge(parts.get(part_number), part)
+
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR IGNORE INTO codes (code, scanned_at) VALUES (?, ?)", codes)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO parts"
+                " (PartNumber, Quantity, Description, DataSheet, ImagePath, updated_at, enriched_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(p['PartNumber'], p['Quantity'], p['Description'], p['DataSheet'], p['ImagePath'], now,
+                  now if p['Description'] is not None else None)
+                 for p in parts.values()]
+            )
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('csv_imported', ?)", (str(now),))
+            self._code_count = self._conn.execute("SELECT COUNT(*) FROM codes").fetchone()[0]
+        log.info("Imported %d codes and %d parts.", len(codes), len(parts))
+        return len(parts)
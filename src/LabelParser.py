@@ -0,0 +1,119 @@
+"""Part number and quantity from the labels distributors put on reels and bags.
+
+Formats are tried in registration order and each one rejects foreign payloads
+with a cheap prefix check before doing any real work. Results are cached per
+payload because the same label is decoded on every frame it is in view.
+
+    parse_label(b"{pbn:PICK2301,pc:C8734,pm:STM32F103C8T6,qty:10}")
+    -> {'format': 'brace', 'pbn': 'PICK2301', 'pc': 'C8734', 'pm': 'STM32F103C8T6', 'qty': '10'}
+
+Every result has a 'format' and a 'pm' (the part number to look up), and a
+'qty' when the label carries one. New formats are added with @register_format.
+"""
+import re
+from functools import lru_cache
+
+# ISO 15434 envelope: "[)>" RS "06" GS field GS field ... RS EOT
+# The separator after the format is left to ISO15434_FIELD, which needs it to find the first field
+ISO15434_HEADER = re.compile(r'\[\)>\x1e?(?P<format>\d\d)')
+# ANSI MH10.8.2 data identifier (up to three digits and a letter) and its value, one pass over all fields
+ISO15434_FIELD = re.compile(r'(?:^|[\x1d\x1e])(\d{0,3}[A-Z])([^\x1d\x1e\x04]*)')
+DATA_IDENTIFIER = re.compile(r'(\d{0,3}[A-Z])(.*)', re.DOTALL)
+# Brace format: {key:value,key:value}, a value runs on past commas not followed by another key
+BRACE_FIELD = re.compile(r'(\w+):([^,]*(?:,(?!\w+:)[^,]*)*)')
+
+# Data identifiers we care about, mapped to result keys
+DATA_IDENTIFIERS = {
+    'P': 'customer_pn',  # DigiKey puts its own part number here
+    '1P': 'mpn',
+    '30P': 'supplier_pn',
+    'Q': 'qty',
+    'K': 'po',
+    '1K': 'order',
+    '10K': 'invoice',
+    '11K': 'packing_list',
+    '9D': 'date_code',
+    '10D': 'date_code',
+    '1T': 'lot',
+    '4L': 'country',
+    '1V': 'manufacturer',
+}
+
+_FORMATS = []  # (name, parse function) in the order they are tried
+
+
+def register_format(name):
+    """Decorator adding a parse function to the registry.
+
+    The function takes the payload text and returns a dict of fields, or None
+    when the payload is not in its format.
+    """
+    def decorator(parse):
+        _FORMATS.append((name, parse))
+        _parse_text.cache_clear()
+        return parse
+    return decorator
+
+
+def parse_label(payload):
+    """Parse a decoded label, returns a new dict with at least 'format' and 'pm', or None."""
+    if isinstance(payload, bytes):
+        payload = payload.decode('utf-8', errors='replace')
+    fields = _parse_text(payload)
+    return dict(fields) if fields is not None else None
+
+
+@lru_cache(maxsize=4096)
+def _parse_text(text):
+    # Cached as tuples so callers can't modify the shared result
+    for name, parse in _FORMATS:
+        fields = parse(text)
+        if fields and fields.get('pm'):
+            return (('format', name),) + tuple(fields.items())
+    return None
+
+
+def _data_identifier_fields(pairs):
+    fields = {}
+    for identifier, value in pairs:
+        key = DATA_IDENTIFIERS.get(identifier)
+        if key is not None and key not in fields:
+            fields[key] = value.strip()
+    part_number = fields.get('mpn') or fields.get('customer_pn')
+    if part_number:
+        fields['pm'] = part_number
+    return fields
+
+
+@register_format('iso15434')
+def parse_iso15434(text):
+    """ISO 15434 format 06 envelopes of MH10.8.2 fields, as on DigiKey and Mouser Data Matrix labels."""
+    if not text.startswith('[)>'):
+        return None
+    header = ISO15434_HEADER.match(text)
+    if header is None or header['format'] != '06':
+        return None
+    return _data_identifier_fields(ISO15434_FIELD.findall(text, header.end()))
+
+
+@register_format('brace')
+def parse_brace(text):
+    """The {key:value,...} QR payload used by LCSC, pm is the part number."""
+    if not text.startswith('{'):
+        return None
+    body = text.strip().strip('{}')
+    return {key: value.strip() for key, value in BRACE_FIELD.findall(body)}
+
+
+@register_format('data_identifier')
+def parse_data_identifier(text):
+    """A lone manufacturer part number field, as in the 1D barcodes on bag labels: "1PLM358DR".
+
+    A bare "P" prefix is not accepted, too many unrelated barcodes start with one.
+    """
+    if not text[:1].isalnum() or '\x1d' in text:
+        return None
+    match = DATA_IDENTIFIER.fullmatch(text.strip())
+    if match is None or match[1] != '1P':
+        return None
+    return _data_identifier_fields([match.groups()])
@@ -0,0 +1,58 @@
+import logging
+import sys
+import threading
+import time
+
+from src import Config
+
+LOG_FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets each message through at most `burst` times per `interval` seconds.
+
+    Messages are keyed on their unformatted template, so a warning logged for
+    every frame with different arguments still counts as one message. The next
+    record let through reports how many were suppressed in between.
+    """
+
+    def __init__(self, interval, burst):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._windows = {}  # (logger, template) -> [window start, count, suppressed]
+
+    def filter(self, record):
+        if self.interval <= 0 or record.levelno >= logging.ERROR:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+            elif window[1] < self.burst:
+                window[1] += 1
+                suppressed = 0
+            else:
+                window[2] += 1
+                return False
+        if suppressed:
+            record.msg = f"{record.getMessage()} ({suppressed} similar messages suppressed)"
+            record.args = None
+        return True
+
+
+def setup_logging(level=Config.LOG_LEVEL, stream=None):
+    """Send log records to stderr (or `stream`) at `level`, rate limited per message."""
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    handler.addFilter(RateLimitFilter(Config.LOG_RATE_INTERVAL, Config.LOG_RATE_BURST))
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+    return handler
@@ -0,0 +1,35 @@
+import time
+from collections import namedtuple
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from src.Metrics import metrics
+from src.Utils import make_part
+
+# state is True (found on Mouser), False (not found) or None (lookup failed)
+LookupResult = namedtuple('LookupResult', ['part_number', 'qty', 'state', 'part'])
+
+
+class LookupService(QObject):
+    """Qt front end for PartLookup, results arrive on the GUI thread through part_resolved."""
+    part_resolved = pyqtSignal(object)
+
+    def __init__(self, lookup):
+        super().__init__()
+        self.lookup = lookup
+
+    def request(self, part_number, qty):
+        requested_at = time.perf_counter()
+        future = self.lookup.lookup(part_number)
+        future.add_done_callback(lambda f: self._resolved(part_number, qty, f.result(), requested_at))
+
+    def _resolved(self, part_number, qty, result, requested_at):
+        # Cache hits included, so this is the lookup latency the user sees
+        metrics.observe('lookup', (time.perf_counter() - requested_at) * 1000)
+        state, info = result
+        # Failed lookups still give a bare part, it is stored and enriched later
+        part = make_part(part_number, qty, info)
+        self.part_resolved.emit(LookupResult(part_number, qty, state, part))
+
+    def close(self):
+        self.lookup.close()
@@ -0,0 +1,199 @@
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from src import Config
+
+log = logging.getLogger(__name__)
+
+
+class RollingWindow:
+    """Ring buffer of the most recent samples, percentiles are only computed when read."""
+
+    def __init__(self, size):
+        self.samples = np.zeros(size, dtype=np.float64)
+        self.size = size
+        self.count = 0  # Lifetime number of samples
+        self.total = 0.0  # Lifetime sum of samples
+        self._lock = threading.Lock()
+
+    def add(self, value):
+        with self._lock:
+            self.samples[self.count % self.size] = value
+            self.count += 1
+            self.total += value
+
+    def recent(self):
+        with self._lock:
+            return self.samples[:min(self.count, self.size)].copy()
+
+    def percentile(self, q):
+        recent = self.recent()
+        return float(np.percentile(recent, q)) if recent.size else 0.0
+
+    def summary(self):
+        recent = self.recent()
+        if not recent.size:
+            return {'count': self.count, 'sum': self.total, 'mean': 0.0, 'p50': 0.0, 'p95': 0.0, 'p99': 0.0,
+                    'max': 0.0}
+        p50, p95, p99 = np.percentile(recent, [50, 95, 99])
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'mean': float(recent.mean()),
+            'p50': float(p50),
+            'p95': float(p95),
+            'p99': float(p99),
+            'max': float(recent.max()),
+        }
+
+
+class Timer:
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, (time.perf_counter() - self.start) * 1000)
+        return False
+
+
+class Metrics:
+    """Named timers (milliseconds), counters and gauges for the hot paths.
+
+    Recording a sample is a lock and an array store; percentiles over the last
+    `window` samples are only computed by snapshot() and the exporters.
+    """
+
+    def __init__(self, window=Config.METRICS_WINDOW):
+        self.window = window
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._timers = {}
+        self._counters = {}
+        self._gauges = {}
+
+    def _timer_window(self, name):
+        window = self._timers.get(name)
+        if window is None:
+            with self._lock:
+                window = self._timers.setdefault(name, RollingWindow(self.window))
+        return window
+
+    def timer(self, name):
+        """Context manager timing its block into `name`."""
+        return Timer(self, name)
+
+    def observe(self, name, value):
+        self._timer_window(name).add(value)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        self._gauges[name] = value
+
+    def percentile(self, name, q):
+        window = self._timers.get(name)
+        return window.percentile(q) if window is not None else 0.0
+
+    def rate(self, name):
+        """Events per second derived from a timer of intervals between events."""
+        window = self._timers.get(name)
+        if window is None:
+            return 0.0
+        recent = window.recent()
+        return 1000.0 / recent.mean() if recent.size and recent.mean() > 0 else 0.0
+
+    def snapshot(self):
+        with self._lock:
+            timers = dict(self._timers)
+            counters = dict(self._counters)
+        return {
+            'timestamp': time.time(),
+            'uptime': time.time() - self.started,
+            'timers_ms': {name: window.summary() for name, window in sorted(timers.items())},
+            'counters': dict(sorted(counters.items())),
+            'gauges': dict(sorted(self._gauges.items())),
+        }
+
+    def to_prometheus(self, prefix="inventory_scanner"):
+        """Render a snapshot in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+        for name, summary in snapshot['timers_ms'].items():
+            metric = f"{prefix}_{_metric_name(name)}_ms"
+            lines.append(f"# TYPE {metric} summary")
+            for quantile, key in (('0.5', 'p50'), ('0.95', 'p95'), ('0.99', 'p99')):
+                lines.append(f'{metric}{{quantile="{quantile}"}} {summary[key]:.6f}')
+            lines.append(f"{metric}_sum {summary['sum']:.6f}")
+            lines.append(f"{metric}_count {summary['count']}")
+        for name, value in snapshot['counters'].items():
+            metric = f"{prefix}_{_metric_name(name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        for name, value in snapshot['gauges'].items():
+            metric = f"{prefix}_{_metric_name(name)}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write a JSON snapshot, or Prometheus text for any other extension, replacing the file atomically."""
+        if path.endswith(".json"):
+            text = json.dumps(self.snapshot(), indent=2)
+        else:
+            text = self.to_prometheus()
+        temp_path = path + ".tmp"
+        with open(temp_path, "w") as file:
+            file.write(text)
+        os.replace(temp_path, path)
+
+
+def _metric_name(name):
+    return "".join(c if c.isalnum() else "_" for c in name)
+
+
+class MetricsExporter:
+    """Writes the metrics to a file every `interval` seconds on a daemon thread."""
+
+    def __init__(self, metrics, path, interval=Config.METRICS_EXPORT_INTERVAL):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-export", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self._export()
+
+    def _export(self):
+        try:
+            self.metrics.write(self.path)
+        except OSError as e:
+            log.warning("Could not write metrics to %s: %s", self.path, e)
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self._export()
+
+
+# Shared by every module, like Config
+metrics = Metrics()
@@ -0,0 +1,85 @@
+"""Local stand-in for the Mouser search API.
+
+Run it with `python -m src.MouserStub --port 8765` and point MOUSER_API_URL at
+http://127.0.0.1:8765/api/v1 to exercise lookups without touching the network.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def stub_part(mpn):
+    return {
+        'MouserPartNumber': mpn,
+        'ManufacturerPartNumber': mpn,
+        'Description': f"Stub part {mpn}",
+        'DataSheetUrl': f"https://example.invalid/datasheets/{mpn}.pdf",
+        'ImagePath': f"https://example.invalid/images/{mpn}.jpg"
+    }
+
+
+class MouserStubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        mpns = body.get("SearchByPartRequest", {}).get("mouserPartNumber", "").split("|")
+
+        with server.lock:
+            server.request_count += 1
+            server.requested.append(mpns)
+        if server.latency:
+            time.sleep(server.latency)
+        if server.fail_status:
+            self.send_error(server.fail_status)
+            return
+
+        parts = [server.parts[mpn] if server.parts is not None else stub_part(mpn)
+                 for mpn in mpns if server.parts is None or mpn in server.parts]
+        payload = json.dumps({
+            "Errors": [],
+            "SearchResults": {"NumberOfResult": len(parts), "Parts": parts}
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MouserStubServer(ThreadingHTTPServer):
+    """Stub server. `parts` maps part numbers to Mouser part records; None answers every part number."""
+    daemon_threads = True
+
+    def __init__(self, port=0, parts=None, latency=0.0, fail_status=None):
+        super().__init__(("127.0.0.1", port), MouserStubHandler)
+        self.parts = parts
+        self.latency = latency
+        self.fail_status = fail_status
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.requested = []
+
+    @property
+    def api_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/api/v1"
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Mouser API stub")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before answering")
+    args = parser.parse_args()
+    server = MouserStubServer(args.port, latency=args.latency)
+    print(f"Mouser stub listening on {server.api_url}")
+    server.serve_forever()
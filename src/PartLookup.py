@@ -0,0 +1,170 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src import Config
+from src.Metrics import metrics
+from src.Utils import search_mouser_parts
+
+log = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Token bucket shared by all lookup workers."""
+
+    def __init__(self, calls_per_minute, burst=1):
+        self.interval = 60.0 / calls_per_minute if calls_per_minute > 0 else 0.0
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def pause(self, seconds):
+        """Hold every caller back for `seconds`, as asked by a 429 answer."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                elif not self.interval:
+                    return
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) / self.interval)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) * self.interval
+            time.sleep(wait)
+
+
+class PartLookup:
+    """Mouser lookups off the calling thread, with caching, coalescing and batching.
+
+    lookup() returns a Future resolving to (state, info): state is True when
+    Mouser found the part, False when it did not and None when the request
+    failed. Concurrent lookups of one part number share a single Future, and
+    part numbers queued within `batch_window` go out in one request.
+    """
+
+    def __init__(self, cache, workers=Config.LOOKUP_WORKERS,
+                 calls_per_minute=Config.MOUSER_CALLS_PER_MINUTE,
+                 batch_size=Config.MOUSER_BATCH_SIZE, batch_window=Config.LOOKUP_BATCH_WINDOW):
+        self.cache = cache
+        self.batch_size = max(1, batch_size)
+        self.batch_window = batch_window
+        self.limiter = RateLimiter(calls_per_minute)
+
+        # One pooled keep-alive session shared by every worker
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lookup")
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._queue = queue.Queue()
+        self._dispatcher = threading.Thread(target=self._dispatch, name="lookup-dispatch", daemon=True)
+        self._dispatcher.start()
+
+        self.cache_hits = 0
+        self.network_calls = 0
+
+    def lookup(self, mpn):
+        cached = self.cache.get(mpn)
+        if cached is not None:
+            self.cache_hits += 1
+            metrics.count('lookup.cache_hits')
+            future = Future()
+            future.set_result(cached)
+            return future
+
+        with self._lock:
+            future = self._inflight.get(mpn)
+            if future is None:
+                future = Future()
+                self._inflight[mpn] = future
+                self._queue.put(mpn)
+        return future
+
+    def _dispatch(self):
+        while True:
+            mpn = self._queue.get()
+            if mpn is None:
+                return
+            batch = [mpn]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    mpn = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if mpn is None:
+                    self._queue.put(None)
+                    break
+                batch.append(mpn)
+            self.executor.submit(self._fetch, batch)
+
+    def _fetch(self, batch):
+        results = None
+        try:
+            self.limiter.acquire()
+            self.network_calls += 1
+            metrics.count('lookup.network_calls')
+            with metrics.timer('lookup.api'):
+                results = search_mouser_parts(batch, self.session)
+            if results is not None:
+                self.cache.put_many(results)
+        except requests.exceptions.RequestException as e:
+            log.warning("HTTP request failed: %s", e)
+            self._respect_retry_after(e.response)
+        except (KeyError, ValueError) as e:
+            log.warning("Unexpected Mouser response: %s", e)
+        except Exception as e:
+            # Anything else still has to resolve the batch, or its waiters hang and it is never looked up again
+            log.exception("Error looking up %s: %s", ', '.join(batch), e)
+            results = None
+        finally:
+            if results is None:
+                metrics.count('lookup.failures')
+            for mpn in batch:
+                with self._lock:
+                    future = self._inflight.pop(mpn, None)
+                if future is None:
+                    continue
+                if results is None:
+                    # Failures are not cached so the next scan tries again
+                    future.set_result((None, None))
+                else:
+                    future.set_result((results.get(mpn) is not None, results.get(mpn)))
+
+    def _respect_retry_after(self, response):
+        if response is None or response.status_code not in (429, 503):
+            return
+        try:
+            seconds = float(response.headers.get('Retry-After', 60))
+        except ValueError:
+            seconds = 60.0  # HTTP dates are rare enough not to bother parsing
+        log.warning("Mouser asked us to slow down, pausing lookups for %.0fs", seconds)
+        metrics.count('lookup.throttled')
+        self.limiter.pause(seconds)
+
+    def close(self):
+        self._queue.put(None)
+        self._dispatcher.join()
+        self.executor.shutdown(wait=True)
+        self.session.close()
@@ -0,0 +1,103 @@
+import threading
+
+import cv2
+import numpy as np
+
+RUNGS = ('clahe', 'sharpen', 'threshold', 'deskew')
+
+
+class Preprocessor:
+    """Escalation ladder of enhancements for grayscale crops that did not decode as they are.
+
+    Rungs run cheapest first and each builds on the one before, so escalating
+    costs one more OpenCV pass per rung rather than a fresh pipeline:
+
+        clahe      local contrast equalisation, for low light and dull glossy bags
+        sharpen    unsharp mask on top, for slightly out of focus labels
+        threshold  adaptive binarisation, for glare and uneven light across a label
+        deskew     rotate the binarised crop upright, for tilted 1D barcodes
+
+    Output goes into buffers reused per thread, so decoding from several
+    workers at once is safe and nothing is allocated per frame.
+    """
+
+    def __init__(self, rungs=RUNGS, clip_limit=2.0, tile_grid=8, sharpen_amount=1.0,
+                 block_size=31, offset=10, min_skew=3.0):
+        unknown = set(rungs) - set(RUNGS)
+        if unknown:
+            raise ValueError(f"Unknown pre-processing steps: {', '.join(sorted(unknown))}")
+        # The ladder order is fixed, only which rungs run is configurable
+        self.rungs = [rung for rung in RUNGS if rung in rungs]
+        self.clip_limit = clip_limit
+        self.tile_grid = tile_grid
+        self.sharpen_amount = sharpen_amount
+        self.block_size = block_size | 1  # Must be odd
+        self.offset = offset
+        self.min_skew = min_skew
+        self._local = threading.local()
+
+    def _buffer(self, name, shape):
+        """A reused array of `shape` for this thread, grown when a bigger crop comes along."""
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None:
+            buffers = self._local.buffers = {}
+        size = shape[0] * shape[1]
+        backing = buffers.get(name)
+        if backing is None or backing.size < size:
+            backing = buffers[name] = np.empty(size, np.uint8)
+        return backing[:size].reshape(shape)
+
+    def _clahe(self):
+        clahe = getattr(self._local, 'clahe', None)
+        if clahe is None:
+            clahe = self._local.clahe = cv2.createCLAHE(self.clip_limit, (self.tile_grid, self.tile_grid))
+        return clahe
+
+    def equalize(self, gray):
+        """Local contrast equalisation into a reused buffer, evens out glare before looking for candidates."""
+        return self._clahe().apply(gray, self._buffer('equalize', gray.shape))
+
+    def variants(self, gray):
+        """Yield (rung, image, inverse) cheapest first.
+
+        `inverse` is None, or a 2x3 affine mapping image coordinates back to
+        `gray`. Images are reused buffers, valid until the next one is yielded.
+        """
+        image = gray
+        for rung in self.rungs:
+            inverse = None
+            if rung == 'clahe':
+                image = self._clahe().apply(image, self._buffer('clahe', gray.shape))
+            elif rung == 'sharpen':
+                blurred = cv2.GaussianBlur(image, (0, 0), 2.0, dst=self._buffer('blur', gray.shape))
+                image = cv2.addWeighted(image, 1 + self.sharpen_amount, blurred, -self.sharpen_amount, 0,
+                                        dst=self._buffer('sharpen', gray.shape))
+            elif rung == 'threshold':
+                if min(gray.shape) <= self.block_size:
+                    continue
+                image = cv2.adaptiveThreshold(image, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY,
+                                              self.block_size, self.offset, dst=self._buffer('threshold', gray.shape))
+            elif rung == 'deskew':
+                deskewed = self._deskew(image)
+                if deskewed is None:
+                    continue
+                image, inverse = deskewed
+            yield rung, image, inverse
+
+    def _deskew(self, image):
+        """Rotate the crop so its dark content lines up with the axes, None if it already does."""
+        dark = cv2.compare(image, 128, cv2.CMP_LT, dst=self._buffer('dark', image.shape))
+        points = cv2.findNonZero(dark)
+        if points is None or len(points) < 16:
+            return None
+        (cx, cy), _, angle = cv2.minAreaRect(points)
+        # minAreaRect angles are in (0, 90], any of the rect's sides lining up will do
+        if angle > 45:
+            angle -= 90
+        if abs(angle) < self.min_skew:
+            return None
+        matrix = cv2.getRotationMatrix2D((cx, cy), angle, 1.0)
+        h, w = image.shape
+        rotated = cv2.warpAffine(image, matrix, (w, h), dst=self._buffer('deskew', image.shape),
+                                 flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+        return rotated, cv2.invertAffineTransform(matrix)
@@ -1,94 +1,131 @@
+import logging
 import os
-import tempfile
-import csv
-import cv2
-import numpy as np
 import time
-from PyQt5.QtCore import QSize, Qt, pyqtSlot, QUrl, QByteArray, QStandardPaths
-from PyQt5.QtWebEngine import QtWebEngine
-from PyQt5.QtWebEngineWidgets import QWebEngineView, QWebEngineSettings
-from PyQt5.QtWidgets import QLabel, QMainWindow, QTextEdit, QGridLayout, QPushButton, QWidget, QSizePolicy
-from PyQt5.QtGui import QPixmap, QImage
-from pyzbar.pyzbar import decode
+from functools import partial
+
+import cv2
+from PyQt5.QtCore import QSize, Qt, pyqtSlot, QUrl, QTimer
+from PyQt5.QtWidgets import QLabel, QMainWindow, QTextEdit, QGridLayout, QPushButton, QWidget, QSizePolicy, \
+    QFileDialog, QMessageBox, QComboBox, QHBoxLayout, QVBoxLayout
+from PyQt5.QtGui import QPixmap, QImage, QGuiApplication, QPixmapCache
+from src.CameraFeed import CameraFeed
 from src.CameraThread import CameraThread
-from src.ImageLoader import AsyncImageLoader
-from src.PdfLoaderThread import PdfLoaderThread
-from src.Utils import set_feed, extract_part_data, build_part_data
+from src.CodeDeduplicator import CodeDeduplicator, DEBOUNCED, KNOWN
+from src.DecodePool import DecodePool
+from src.RoiDecoder import RoiDecoder
+from src import Config
+from src.Metrics import MetricsExporter, metrics
+from src.QtUtils import set_feed
+from src.StartupTimer import StartupTimer
+from src.StoreLoader import StoreLoader
+from src.Utils import extract_part_data
 
+log = logging.getLogger(__name__)
 
 
 class QrReader(QMainWindow):
-    def __init__(self):
+    """Main window. Startup is staged: the camera feed goes live first while the
+    store loads in the background, and the PDF viewer and network stacks are only
+    created the first time they are needed."""
+
+    def __init__(self, startup=None):
         super().__init__()
+        self.startup = startup or StartupTimer()
         try:
-            # Block 1: Initialize Detection and Data Structures
-            print("Initializing detection and data structures...")
-            self.detected_Codes = set()
-            self.part_data_list = []
+            # Block 1: Load the inventory store in the background, scanning starts once it is ready
+            log.debug("Loading inventory store in the background...")
+            self.store = None
+            self.store_error = None
+            self.journal = None
+            self.dedup = None
             self.found_codes = 0
             self.not_found_codes = 0
-            self.last_detections = None
-            self.code_timestamps = dict()
-            self.load_or_create_files()
-            print("Detection and data structures initialized.")
-
-            # Block 2: Initialize Image Loader and Set Display Size
-            print("Setting up image loader and display size...")
-            self.pdf_loader_thread = None
-            self.image_loader = AsyncImageLoader()
-            self.image_loader.image_loaded.connect(self.display_image)
+            self.store_loader = StoreLoader(Config.INVENTORY_DB_PATH, Config.JOURNAL_PATH)
+            self.store_loader.store_loaded.connect(self.on_store_loaded)
+            self.store_loader.store_failed.connect(self.on_store_failed)
+            self.store_loader.start()
+
+            # Block 2: Set Display Size, caches and network stacks are created on first use
+            log.debug("Setting up display size...")
+            self._asset_cache = None
+            self._download_manager = None
+            self._image_loader = None
+            self._lookup_service = None
+            QPixmapCache.setCacheLimit(Config.PIXMAP_CACHE_KB)
+            self.current_image_url = None
             self.setMaximumSize(QSize(1920, 1080))
             self.resize(1920, 1080)
             self.display_size = (640, 360)
-            print("Image loader and display size set.")
+            self.tile_size = (320, 180)
+            log.debug("Display size set.")
 
             # Block 3: Set Window Properties
-            print("Setting up window properties...")
+            log.debug("Setting up window properties...")
             self.setWindowTitle("Inventory Management")
             self.rawCamera = QLabel()
             self.boundingBoxCamera = QLabel()
             self.infoBox = QTextEdit()
             self.infoBox.setReadOnly(True)
             self.imageLabel = QLabel()
-            print("Window properties set.")
-
-            # Block 4: Configure PDF Viewer
-            print("Configuring PDF viewer...")
-            self.pdfViewer = QWebEngineView()
-            self.pdfViewer.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-            self.pdf_loader_thread = None
-            self.pdfSettings = self.pdfViewer.settings()
-            self.pdfSettings.setAttribute(QWebEngineSettings.PluginsEnabled, True)
-            self.pdfViewer.setMinimumSize(600, 400)
-            self.pdfViewer.setAttribute(Qt.WA_OpaquePaintEvent)
-            self.pdfViewer.setStyleSheet("background-color: white;")
-            print("PDF viewer configured.")
+            log.debug("Window properties set.")
+
+            # Block 4: Reserve space for the PDF viewer, QWebEngine loads with the first datasheet
+            self.pdfViewer = None
+            self.pdfContainer = QWidget()
+            self.pdfContainer.setLayout(QVBoxLayout())
+            self.pdfContainer.layout().setContentsMargins(0, 0, 0, 0)
+            self.pdfContainer.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+            self.pdfContainer.setMinimumSize(600, 400)
+            self.pdfContainer.setStyleSheet("background-color: white;")
 
             # Block 5: Initialize Labels for Scanned Code Counts
-            print("Initializing labels for scanned code counts...")
+            log.debug("Initializing labels for scanned code counts...")
             self.scannedCodesLabel = QLabel("Scanned Codes:")
             self.mouserHitsLabel = QLabel("Found on Mouser:")
             self.notFoundLabel = QLabel("Not found on Mouser:")
             self.scannedCodesCounterLabel = QLabel("0")
             self.foundCodesCounterLabel = QLabel("0")
             self.notFoundCodesCounterLabel = QLabel("0")
-            print("Labels initialized.")
+            self.enrichmentLabel = QLabel("Enrichment:")
+            self.enrichmentStatusLabel = QLabel("idle")
+            log.debug("Labels initialized.")
+
+            # Block 5b: One capture thread and feed per camera, the big views show the selected one
+            log.debug("Setting up camera feeds...")
+            multi_camera = len(Config.CAMERA_SOURCES) > 1
+            self.feeds = [CameraFeed(i, CameraThread(source, camera_id=i), self.display_size,
+                                     self.tile_size if multi_camera else None)
+                          for i, source in enumerate(Config.CAMERA_SOURCES)]
+            self.selected_feed = self.feeds[0]
+            self.cameraSelector = QComboBox()
+            self.cameraSelector.addItems([f"{feed.name}: {feed.camera_thread.source}" for feed in self.feeds])
+            self.cameraSelector.currentIndexChanged.connect(self.select_camera)
+            self.cameraTiles = [QLabel() for _ in self.feeds]
+            self.cameraStatsLabels = [QLabel(feed.name) for feed in self.feeds]
+            for tile in self.cameraTiles:
+                tile.setFixedSize(*self.tile_size)
+            log.debug("Camera feeds set up.")
 
             # Block 6: Set up Buttons
-            print("Setting up buttons...")
+            log.debug("Setting up buttons...")
             self.settingsButton = QPushButton("Open Camera Settings")
             self.settingsButton.clicked.connect(self.open_camera_settings)
             self.exportButton = QPushButton("Export CSV")
+            self.exportButton.clicked.connect(self.export_inventory)
+            self.export_thread = None
+            self.inventoryButton = QPushButton("Inventory")
+            self.inventoryButton.clicked.connect(self.open_inventory)
+            self.inventory_browser = None
             self.exitButton = QPushButton("Exit")
             self.exitButton.clicked.connect(self.close)
-            print("Buttons set up.")
+            log.debug("Buttons set up.")
 
             # Block 7: Arrange Layout
-            print("Arranging layout...")
+            log.debug("Arranging layout...")
             layout = QGridLayout()
             layout.addWidget(self.rawCamera, 0, 0, 2, 2)
             layout.addWidget(self.boundingBoxCamera, 0, 2, 2, 2)
-            layout.addWidget(self.pdfViewer, 0, 4, 6, 2)
+            layout.addWidget(self.pdfContainer, 0, 4, 6, 2)
             layout.addWidget(self.imageLabel, 2, 0, 1, 2)
             layout.addWidget(self.infoBox, 2, 2, 4, 2)
             layout.addWidget(self.scannedCodesLabel, 3, 0)
@@ -97,277 +134,509 @@ class QrReader(QMainWindow):
             layout.addWidget(self.foundCodesCounterLabel, 4, 1)
             layout.addWidget(self.notFoundLabel, 5, 0)
             layout.addWidget(self.notFoundCodesCounterLabel, 5, 1)
-            layout.addWidget(self.settingsButton, 6, 0, 1, 2)
-            layout.addWidget(self.exportButton, 6, 2, 1, 2)
-            layout.addWidget(self.exitButton, 6, 4, 1, 2)
+            layout.addWidget(self.enrichmentLabel, 6, 0)
+            layout.addWidget(self.enrichmentStatusLabel, 6, 1)
+            layout.addWidget(self.settingsButton, 7, 0, 1, 2)
+            layout.addWidget(self.inventoryButton, 7, 2)
+            layout.addWidget(self.exportButton, 7, 3)
+            layout.addWidget(self.exitButton, 7, 4, 1, 2)
+            if multi_camera:
+                tiles = QHBoxLayout()
+                tiles.addWidget(self.cameraSelector)
+                for tile, stats_label in zip(self.cameraTiles, self.cameraStatsLabels):
+                    column = QVBoxLayout()
+                    column.addWidget(tile)
+                    column.addWidget(stats_label)
+                    tiles.addLayout(column)
+                tiles.addStretch()
+                layout.addLayout(tiles, 8, 0, 1, 6)
             layout.setContentsMargins(10, 10, 10, 10)
             layout.setSpacing(10)
             central_widget = QWidget()
             central_widget.setLayout(layout)
             self.setCentralWidget(central_widget)
-            print("Layout arranged.")
-
-            # Block 8: Initialize Camera Thread
-            print("Initializing camera thread...")
-            self.camera_thread = CameraThread()
-            self.camera_thread.frame_captured.connect(self.process_frame)
-            self.camera_thread.start()
-            print("Camera thread initialized and started.")
+            log.debug("Layout arranged.")
+
+            # Block 8: Initialize Decode Pool and Camera Threads
+            log.debug("Initializing decode pool and camera threads...")
+            workers = Config.DECODE_WORKERS or min(os.cpu_count() or 2, len(self.feeds) + 1)
+            self.decode_pool = DecodePool(workers=workers)
+            self.decode_pool.codes_decoded.connect(self.handle_decoded)
+            for feed in self.feeds:
+                camera = feed.camera_thread
+                # Each camera gets its own decoder so region tracking stays per camera
+                self.decode_pool.add_source(feed.camera_id, RoiDecoder(on_activity=camera.report_activity))
+                # Submit straight from the capture thread so frames never queue up on the GUI thread
+                camera.frame_captured.connect(partial(self.decode_pool.submit, source=feed.camera_id),
+                                              Qt.DirectConnection)
+                camera.frame_captured.connect(feed.latest_frame.put, Qt.DirectConnection)
+            self.decode_pool.start()
+            for feed in self.feeds:
+                feed.camera_thread.start()
+            log.debug("Decode pool and camera threads initialized and started.")
+
+            # Block 8b: Paint the newest frame at the screen refresh rate, independent of capture rate
+            refresh_rate = QGuiApplication.primaryScreen().refreshRate() or 60
+            self.display_timer = QTimer(self)
+            self.display_timer.setTimerType(Qt.PreciseTimer)
+            self.display_timer.timeout.connect(self.process_frame)
+            self.display_timer.start(int(1000 / refresh_rate))
+            self.stats_timer = QTimer(self)
+            self.stats_timer.timeout.connect(self.update_camera_stats)
+            if multi_camera:
+                self.stats_timer.start(500)
+            self.enrichment = None
+            self.enrichment_timer = QTimer(self)
+            self.enrichment_timer.timeout.connect(self.update_enrichment_status)
+
+            # Block 8c: Optional metrics export for dashboards
+            self.last_painted_at = None
+            self.metrics_exporter = None
+            if Config.METRICS_EXPORT_PATH:
+                self.metrics_exporter = MetricsExporter(metrics, Config.METRICS_EXPORT_PATH)
+                self.metrics_exporter.start()
 
             # Block 9: Finalize Setup and Display Window
-            print("Finalizing setup and displaying window...")
+            log.debug("Finalizing setup and displaying window...")
             self.update_counters()
             self.showFullScreen()
-            print("Initialization complete. Window displayed.")
+            self.startup.mark('window')
+            log.info("Initialization complete. Window displayed.")
 
         except Exception as e:
-            print(f"Error during initialization: {e}")
+            log.exception("Error during initialization: %s", e)
+
+    @pyqtSlot(object, object)
+    def on_store_loaded(self, store, journal):
+        self.store = store
+        self.journal = journal
+        self.dedup = CodeDeduplicator(store)
+        self.update_counters()
+        self.startup.mark('store')
+        # Enrichment needs the network stack, so it starts on the first tick once the window has settled
+        self.enrichment_timer.start(3000)
+
+    def on_store_failed(self, error):
+        # Scans are dropped until the store opens, which won't happen without a restart
+        log.error("Inventory store unavailable, scans will not be recorded: %s", error)
+        self.store_error = error
+        self.update_counters()
+        QMessageBox.critical(self, "Inventory Store",
+                             f"Could not open the inventory store, scans will not be recorded.\n\n{error}")
+
+    @property
+    def asset_cache(self):
+        if self._asset_cache is None:
+            from src.AssetCache import AssetCache
+            self._asset_cache = AssetCache(Config.ASSET_CACHE_DIR, Config.ASSET_CACHE_MAX_BYTES)
+        return self._asset_cache
+
+    @property
+    def download_manager(self):
+        if self._download_manager is None:
+            from src.DownloadManager import DownloadManager
+            self._download_manager = DownloadManager(self.asset_cache)
+            self._download_manager.download_finished.connect(self.display_pdf)
+        return self._download_manager
+
+    @property
+    def image_loader(self):
+        if self._image_loader is None:
+            from src.ImageLoader import AsyncImageLoader
+            self._image_loader = AsyncImageLoader(self.asset_cache)
+            self._image_loader.image_loaded.connect(self.display_image)
+        return self._image_loader
+
+    @property
+    def lookup_service(self):
+        if self._lookup_service is None:
+            from src.LookupService import LookupService
+            from src.PartLookup import PartLookup
+            from src.ResponseCache import ResponseCache
+            cache = ResponseCache(Config.LOOKUP_CACHE_PATH, Config.LOOKUP_CACHE_TTL, Config.LOOKUP_NEGATIVE_TTL)
+            self._lookup_service = LookupService(PartLookup(cache))
+            self._lookup_service.part_resolved.connect(self.on_part_resolved)
+        return self._lookup_service
+
+    def ensure_pdf_viewer(self):
+        """Create the QWebEngine PDF viewer the first time a datasheet is shown"""
+        if self.pdfViewer is None:
+            log.debug("Configuring PDF viewer...")
+            with metrics.timer('startup.pdf_viewer'):
+                from PyQt5.QtWebEngineWidgets import QWebEngineView, QWebEngineSettings
+                self.pdfViewer = QWebEngineView()
+                self.pdfViewer.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+                self.pdfSettings = self.pdfViewer.settings()
+                self.pdfSettings.setAttribute(QWebEngineSettings.PluginsEnabled, True)
+                self.pdfViewer.setMinimumSize(600, 400)
+                self.pdfViewer.setAttribute(Qt.WA_OpaquePaintEvent)
+                self.pdfViewer.setStyleSheet("background-color: white;")
+                self.pdfContainer.layout().addWidget(self.pdfViewer)
+            log.debug("PDF viewer configured.")
+        return self.pdfViewer
 
     def update_counters(self):
-        self.scannedCodesCounterLabel.setText(f"{(len(self.detected_Codes))}")
+        if self.store is not None:
+            self.scannedCodesCounterLabel.setText(f"{self.store.code_count()}")
+        else:
+            self.scannedCodesCounterLabel.setText("unavailable" if self.store_error else "...")
         self.foundCodesCounterLabel.setText(f"{self.found_codes}")
         self.notFoundCodesCounterLabel.setText(f"{self.not_found_codes}")
-    def load_or_create_files(self):
-        # Check or create uniquecodes.csv
-        if not os.path.exists("uniquecodes.csv"):
-            with open("uniquecodes.csv", mode="w", newline='') as file:
-                writer = csv.writer(file)
-                writer.writerow(["Code"])  # Add a header row
-
-        else:
-            with open("uniquecodes.csv", mode="r") as file:
-                reader = csv.reader(file)
-                next(reader, None)  # Skip header
-                for row in reader:
-                    if row:  # Avoid empty rows
-                        self.detected_Codes.add(row[0])
-
-        # Check or create components.csv
-        if not os.path.exists("components.csv"):
-            with open("components.csv", mode="w", newline='') as file:
-                writer = csv.DictWriter(file, fieldnames=["PartNumber", "Quantity", "ImagePath", "DataSheet"])
-                writer.writeheader()
-
-        else:
-            with open("components.csv", mode="r") as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    if row:  # Avoid empty rows
-                        self.part_data_list.append(row)
     def load_pdf_from_url(self, pdf_url):
         """Load PDF from URL and display it using QWebEngineView"""
-        print(f"Starting PDF load for URL: {pdf_url}")
-
-        # Check if the PDF URL is None or empty
-        if not pdf_url:
-            # Use a blank webpage if no PDF URL is provided
-            pdf_url = "data:text/html,<html><body></body></html>"
-
-        if self.pdf_loader_thread:
-            self.pdf_loader_thread.terminate()
-        self.pdf_loader_thread = PdfLoaderThread(pdf_url)
-        self.pdf_loader_thread.pdf_loaded.connect(self.display_pdf)
-        self.pdf_loader_thread.start()
-
-    @pyqtSlot(QByteArray)
-    def display_pdf(self, pdf_data):
-        """Handle displaying PDF after it's downloaded"""
-        # Get the temporary directory in a Windows-friendly way
-        temp_dir = tempfile.gettempdir()  # Standard temp directory for Windows
-        temp_file_path = os.path.join(temp_dir, "temp.pdf")  # Save PDF as temp.pdf
-
-        print(f"Saving PDF to: {temp_file_path}")
-
+        log.debug("Starting PDF load for URL: %s", pdf_url)
+        # Supersedes any datasheet still downloading, only the newest one reaches the viewer
+        self.download_manager.request(pdf_url)
+
+    @pyqtSlot(int, str, str)
+    def display_pdf(self, request_id, url, pdf_path):
+        """Show a downloaded PDF straight from the asset cache, or a blank page"""
+        if not self.download_manager.is_current(request_id):
+            return
         try:
-            with open(temp_file_path, "wb") as pdf_file:
-                pdf_file.write(pdf_data)
-            print("PDF saved successfully.")
-
             # Set the URL and force the viewer to update
-            pdf_url = QUrl.fromLocalFile(temp_file_path)
+            pdf_url = QUrl.fromLocalFile(pdf_path) if pdf_path else QUrl("about:blank")
+            self.ensure_pdf_viewer()
             self.pdfViewer.setUrl(pdf_url)
-            self.pdfViewer.load(pdf_url)
             self.pdfViewer.update()
             self.pdfViewer.repaint()
-            print("PDF loaded into viewer successfully.")
+            log.debug("PDF loaded into viewer successfully.")
         except Exception as e:
-            print(f"Error displaying PDF: {e}")
+            log.error("Error displaying PDF: %s", e)
 
     def load_image_from_url(self, url):
+        self.current_image_url = url
+        if not url:
+            # No image for this part, don't leave the previous part's on screen
+            self.imageLabel.clear()
+            return
+        # Thumbnails already scaled for the label are kept in memory
+        pixmap = QPixmapCache.find(self.thumbnail_key(url))
+        if pixmap is not None:
+            self.imageLabel.setPixmap(pixmap)
+            self.imageLabel.setFixedSize(pixmap.size())
+            return
         self.image_loader.load_image(url)  # Call the load_image method
-    @pyqtSlot(QImage)
-    def display_image(self, q_image):
+
+    def thumbnail_key(self, url):
+        return f"{url}@{self.imageLabel.width()}x{self.imageLabel.height()}"
+
+    @pyqtSlot(str, QImage)
+    def display_image(self, url, q_image):
+        if url != self.current_image_url:
+            return  # A newer part was scanned while this image loaded
         if not q_image.isNull():
+            key = self.thumbnail_key(url)
             pixmap = QPixmap.fromImage(q_image)
             scaled_pixmap = pixmap.scaled(self.imageLabel.size(),
                                           aspectRatioMode=Qt.AspectRatioMode.KeepAspectRatio,
                                           transformMode=Qt.TransformationMode.SmoothTransformation)
+            QPixmapCache.insert(key, scaled_pixmap)
             self.imageLabel.setPixmap(scaled_pixmap)
             self.imageLabel.setFixedSize(scaled_pixmap.size())
         else:
-            print("Received an invalid QImage for display.")
+            log.warning("Received an invalid QImage for display.")
             self.imageLabel.clear()
     # Helper function to handle data retrieval
     def fetch_local_data(self, part_number):
         """Check if part exists locally and return it if found."""
-        print(f"Searching for {part_number} in database")
-        local_data = next((item for item in self.part_data_list if item['PartNumber'] == part_number), None)
+        log.debug("Searching for %s in database", part_number)
+        local_data = self.store.get_part(part_number)
 
         if local_data:
-            print("Part exists in database, using locally available data:", local_data)
+            log.debug("Part exists in database, using locally available data: %s", local_data)
             return True, local_data  # Return dictionary directly
 
-        print("Part not found in database, returning None")
+        log.debug("Part not found in database, returning None")
         return False, None
 
     def fetch_data_from_api(self, part_number, qty):
-        """Fetch part data from API if not found locally, and add it to the database if available."""
-        state, part_data = build_part_data(part_number, qty)
-        if state:
-            print("Found part in Mouser... Adding to database")
-            self.part_data_list.append(part_data)
+        """Queue a Mouser lookup for a part not found locally, the answer arrives in on_part_resolved."""
+        log.debug("Looking up %s on Mouser", part_number)
+        self.lookup_service.request(part_number, qty)
+
+    @pyqtSlot(object)
+    def on_part_resolved(self, result):
+        """Add a looked up part to the database and display it"""
+        fetched_data = result.part
+        if result.state is None:
+            # Stored without Mouser info so scanning goes on offline, the enrichment queue fills it in later
+            log.warning("Lookup failed for %s, storing it for enrichment", result.part_number)
+            self.journal.record_part(fetched_data, self.store)
+            if self.enrichment is not None:
+                self.enrichment.notify()
+            self.infoBox.setText(
+                f"Lookup failed, will retry\nPart Number: {result.part_number}\nQuantity: {result.qty}")
+            self.current_image_url = None
+            self.imageLabel.clear()
+            return
+
+        if result.state:
+            log.info("Found %s on Mouser, adding to database", result.part_number)
             self.found_codes += 1
-            return True, part_data
         else:
-            print("Not found in Mouser, storing basic part number and quantity")
+            log.info("%s not found on Mouser, storing basic part number and quantity", result.part_number)
             self.not_found_codes += 1
-            return False, part_data
-
-    def detect_codes(self, image):
+        # Journal the part, then add it to the store, adding to the quantity if it is already there
+        self.journal.record_part(fetched_data, self.store)
+        # Fetch its assets in the background so the next scan shows them instantly, even offline
+        self.download_manager.prefetch(fetched_data.get("DataSheet"), fetched_data.get("ImagePath"))
+
+        if result.state:
+            # Display the fetched data
+            display_text = '\n'.join([f"{key}: {value}" for key, value in fetched_data.items()])
+            self.infoBox.setText(display_text)
+            self.load_image_from_url(fetched_data.get('ImagePath'))
+        else:
+            # Show "Not found" message if API didn't find the part
+            self.infoBox.setText(
+                f"Not found on Mouser\nPart Number: {fetched_data.get('PartNumber')}\nQuantity: {fetched_data.get('Quantity')}")
+            self.current_image_url = None
+            self.imageLabel.clear()
+        self.load_pdf_from_url(fetched_data.get("DataSheet"))
+        self.update_counters()
+
+    @pyqtSlot(object)
+    def show_part(self, part):
+        """Show a stored part's details, image and datasheet."""
+        self.infoBox.setText('\n'.join([f"{key}: {value}" for key, value in part.items()]))
+        self.load_image_from_url(part.get('ImagePath'))
+        self.load_pdf_from_url(part.get("DataSheet"))
+
+    def open_inventory(self):
+        """Show the searchable inventory, created the first time it is opened"""
+        if self.store is None:
+            return
+        if self.inventory_browser is None:
+            from src.InventoryBrowser import InventoryBrowser
+            self.inventory_browser = InventoryBrowser(self.store, self)
+            self.inventory_browser.part_activated.connect(self.show_part)
+        self.inventory_browser.show()
+        self.inventory_browser.raise_()
+        self.inventory_browser.activateWindow()
+
+    @pyqtSlot(object)
+    def handle_decoded(self, result):
+        """Receive decode results from the pool on the GUI thread
+
+        The deduplicator is shared by every camera, so a reel seen by two
+        cameras at once is only counted once.
+        """
+        self.feeds[result.source].update_detections(result)
+        if self.dedup is None:
+            return  # Still loading the store, the codes come round again on the next frame
+        new_codes = self.detect_codes(result.codes, result.source)
+        self.update_info(new_codes)
+
+    def detect_codes(self, detections, source=0):
+        """Act on every code not seen within the debounce window, returns the ones never seen before"""
+        new_codes = []
         try:
-            detections = decode(image)
-            current_time = time.time()
-            timeout_duration = 20  # Set timeout in seconds
-
             if detections:
                 for code in detections:
-                    code_data = code.data.decode('utf-8')
-
-                    # Check if the code was recently scanned
-                    if code_data in self.code_timestamps:
-                        time_since_last_scan = current_time - self.code_timestamps[code_data]
-                        if time_since_last_scan < timeout_duration:
-                            # Skip if detected within the timeout
-                            continue
-
-
-                    # Update the timestamp for this code
-                    self.code_timestamps[code_data] = current_time
-
-                    if code_data in self.detected_Codes:
-                        print("Scanned code already in database")
-                        if code.type == "QRCODE":
-                            extracted_part_data = extract_part_data(code.data)
-
-                            if extracted_part_data:
-                                part_number = extracted_part_data.get('pm')
-                                qty = extracted_part_data.get('qty')
-
-                                # Fetch data locally since the code was previously detected
-                                state, fetched_data = self.fetch_local_data(part_number)
-
-                                if state and isinstance(fetched_data, dict):
-                                    display_text = '\n'.join([f"{key}: {value}" for key, value in fetched_data.items()])
-                                    self.foundCodesCounterLabel.setText(f'{self.found_codes}')
-                                    self.infoBox.setText(display_text)
-                                    self.load_image_from_url(fetched_data.get('ImagePath'))
-                                    self.load_pdf_from_url(fetched_data.get("DataSheet"))
-                                else:
-                                    print("Local data not found, this shouldn't happen.")
-                                    self.infoBox.setText("Data unavailable.")
+                    code_data = code.data.decode('utf-8', errors='replace')
+
+                    # One decision per sighting: repeat within the window, known code or new code
+                    decision = self.dedup.check(code_data)
+                    if decision == DEBOUNCED:
+                        continue
+
+                    # Every symbology is parsed, the label format decides what it holds
+                    with metrics.timer('parse'):
+                        extracted_part_data = extract_part_data(code.data)
+                    # Queued for the journal writer, nothing here touches the disk
+                    self.journal.record_scan(code_data, code.type, source, decision, extracted_part_data or None)
+
+                    if decision == KNOWN:
+                        log.debug("Scanned code already in database")
+                        if extracted_part_data:
+                            part_number = extracted_part_data.get('pm')
+
+                            # Fetch data locally since the code was previously detected
+                            state, fetched_data = self.fetch_local_data(part_number)
+
+                            if state and isinstance(fetched_data, dict):
+                                self.foundCodesCounterLabel.setText(f'{self.found_codes}')
+                                self.show_part(fetched_data)
+                            else:
+                                log.warning("Local data not found for %s, this shouldn't happen.", part_number)
+                                self.infoBox.setText("Data unavailable.")
                         self.update_counters()
 
                     else:
-                        # New code detected
-                        print("New Code Detected...")
-                        self.detected_Codes.add(code_data)
-                        self.scannedCodesCounterLabel.setText(f'{len(self.detected_Codes)}')
-
-                        # Add new code to uniquecodes.csv
-                        with open("uniquecodes.csv", mode="a", newline='') as file:
-                            writer = csv.writer(file)
-                            writer.writerow([code_data])
-
-                        # Handle QR Code logic for new data
-                        if code.type == 'QRCODE':
-                            extracted_part_data = extract_part_data(code.data)
-                            if extracted_part_data:
-                                part_number = extracted_part_data.get('pm')
-                                qty = extracted_part_data.get('qty')
-
-                                # Try fetching from API if it's a new part
-                                state, fetched_data = self.fetch_data_from_api(part_number, qty)
-
-                                # Add fetched data to components.csv if available
-                                with open("components.csv", mode="a", newline='') as file:
-                                    writer = csv.DictWriter(file, fieldnames=fetched_data.keys())
-                                    writer.writerow(fetched_data)
-                                if state:
-                                    # Display the fetched data
-                                    display_text = '\n'.join(
-                                        [f"{key}: {value}" for key, value in fetched_data.items()])
-                                    self.found_codes +=1
-                                    self.infoBox.setText(display_text)
-                                    self.load_image_from_url(fetched_data.get('ImagePath'))
-                                    self.part_data_list.append(fetched_data)
-                                    self.load_pdf_from_url(fetched_data.get("DataSheet"))
-
-                                else:
-                                    # Show "Not found" message if API didn't find the part
-                                    self.infoBox.setText(
-                                        f"Not found on Mouser\nPart Number: {fetched_data.get('PartNumber')}\nQuantity: {fetched_data.get('Quantity')}")
-                                    self.not_found_codes +=1
-                                    self.imageLabel.clear()
-                                    self.part_data_list.append(fetched_data)
-                                    self.load_pdf_from_url(fetched_data.get("DataSheet"))
+                        # New code detected, the deduplicator already recorded it
+                        log.debug("New Code Detected...")
+                        new_codes.append(code)
+                        self.scannedCodesCounterLabel.setText(f'{self.store.code_count()}')
+
+                        # Any label with a part number, the label already gave us part number and quantity
+                        if extracted_part_data:
+                            part_number = extracted_part_data.get('pm')
+                            qty = extracted_part_data.get('qty')
+
+                            # Look it up on Mouser in the background
+                            self.fetch_data_from_api(part_number, qty)
                         self.update_counters()
-            return detections
+            return new_codes
 
         except Exception as e:
-            print(f"Error in detect_codes: {e}")
-            return []
-
-    def process_frame(self, frame):
-        if self.isVisible():
-            captured_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            raw_feed = cv2.resize(captured_frame, self.display_size)
-            cv2.putText(raw_feed, "Raw Feed", (10, 10), cv2.FONT_HERSHEY_PLAIN, 1, (255, 0, 0), 1)
-            set_feed(raw_feed, self.rawCamera)
-
-            detection_feed = cv2.resize(captured_frame, self.display_size)
-            detections = self.detect_codes(detection_feed)
-            cv2.putText(detection_feed, f'Detections: {len(detections)}', (10, 10), cv2.FONT_HERSHEY_PLAIN, 1, (255, 0, 0), 1)
-
-            for qr_code in detections:
-                points = qr_code.polygon
-                if len(points) > 4:
-                    hull = cv2.convexHull(np.array([point for point in points], dtype=np.float32))
-                    hull = list(map(tuple, np.squeeze(hull)))
-                else:
-                    hull = points
-                n = len(hull)
-                for j in range(n):
-                    pt1 = tuple(map(int, hull[j]))
-                    pt2 = tuple(map(int, hull[(j + 1) % n]))
-                    cv2.line(detection_feed, pt1, pt2, (0, 255, 60), 5)
-
-            set_feed(detection_feed, self.boundingBoxCamera)
-            self.update_info(detections)
+            log.exception("Error in detect_codes: %s", e)
+            return new_codes
+
+    def process_frame(self):
+        if not self.isVisible():
+            return
+        start = time.perf_counter()
+        painted = False
+        for feed, tile in zip(self.feeds, self.cameraTiles):
+            if not feed.render():
+                continue
+            painted = True
+            if feed is self.selected_feed:
+                self.draw_feeds()
+            if feed.tile_buffer is not None:
+                set_feed(feed.tile_buffer, tile)
+        if not painted:
+            return
+        now = time.perf_counter()
+        metrics.observe('display', (now - start) * 1000)
+        if self.last_painted_at is not None:
+            metrics.observe('display.interval', (now - self.last_painted_at) * 1000)
+        else:
+            self.startup.mark('first_frame')
+        self.last_painted_at = now
+        metrics.gauge('decode.queue_depth', self.decode_pool.queue_depth())
+
+    def draw_feeds(self):
+        raw_feed = self.selected_feed.display_buffer
+        cv2.putText(raw_feed, "Raw Feed", (10, 10), cv2.FONT_HERSHEY_PLAIN, 1, (0, 0, 255), 1)
+        set_feed(raw_feed, self.rawCamera)
+
+        detection_feed = self.selected_feed.annotated_buffer
+        if Config.METRICS_OVERLAY:
+            self.draw_metrics_overlay(detection_feed)
+        set_feed(detection_feed, self.boundingBoxCamera)
+
+    def draw_metrics_overlay(self, feed):
+        """Draw display and camera FPS, decode p95 and the decode queue depth in the corner of a feed"""
+        camera_fps = metrics.rate(self.selected_feed.camera_thread.interval_metric)
+        lines = [
+            f"FPS {metrics.rate('display.interval'):.1f} (camera {camera_fps:.1f})",
+            f"Decode p95 {metrics.percentile('decode', 95):.1f} ms",
+            f"Queue depth {self.decode_pool.queue_depth()}",
+        ]
+        for i, line in enumerate(lines):
+            y = feed.shape[0] - 10 - 16 * (len(lines) - 1 - i)
+            cv2.putText(feed, line, (10, y), cv2.FONT_HERSHEY_PLAIN, 1, (0, 255, 255), 1)
+
+    def export_inventory(self):
+        """Ask where to export the inventory and stream it there on a background thread"""
+        if self.export_thread is not None or self.store is None:
+            return
+        from src.Exporter import LAST_EXPORT_KEY
+        from src.ExportThread import ExportThread
+        path, _ = QFileDialog.getSaveFileName(self, "Export Inventory", "inventory.csv",
+                                              "CSV (*.csv);;Excel (*.xlsx);;JSON Lines (*.jsonl)")
+        if not path:
+            return
+        incremental = False
+        if self.store.get_meta(LAST_EXPORT_KEY) is not None:
+            answer = QMessageBox.question(self, "Export Inventory",
+                                          "Only export parts changed since the last export?",
+                                          QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+            incremental = answer == QMessageBox.Yes
+        self.export_thread = ExportThread(self.store, path, incremental)
+        self.export_thread.progress.connect(self.on_export_progress)
+        self.export_thread.export_finished.connect(self.on_export_finished)
+        self.export_thread.export_failed.connect(self.on_export_failed)
+        self.export_thread.finished.connect(self.on_export_done)
+        self.exportButton.setEnabled(False)
+        self.exportButton.setText("Exporting...")
+        self.export_thread.start()
+
+    @pyqtSlot(int, int)
+    def on_export_progress(self, done, total):
+        self.exportButton.setText(f"Exporting... {done}/{total}")
+
+    @pyqtSlot(str, int)
+    def on_export_finished(self, path, rows):
+        self.infoBox.append(f"Exported {rows} parts to {path}\n")
+
+    @pyqtSlot(str)
+    def on_export_failed(self, error):
+        self.infoBox.append(f"Export failed: {error}\n")
+
+    def on_export_done(self):
+        self.export_thread = None
+        self.exportButton.setEnabled(True)
+        self.exportButton.setText("Export CSV")
 
     def closeEvent(self, event):
-        self.camera_thread.release()
-        self.camera_thread.wait()
+        self.display_timer.stop()
+        if self.inventory_browser is not None:
+            self.inventory_browser.refresh_timer.stop()
+        if self.export_thread is not None:
+            self.export_thread.cancel()
+            self.export_thread.wait()
+        self.stats_timer.stop()
+        for feed in self.feeds:
+            feed.camera_thread.release()
+        self.decode_pool.stop()
+        self.enrichment_timer.stop()
+        if self.enrichment is not None:
+            self.enrichment.stop()
+        if self._lookup_service is not None:
+            self._lookup_service.close()
+        if self._download_manager is not None:
+            self._download_manager.close()
+        self.store_loader.wait()
+        if self.journal is not None:
+            self.journal.close()
+        if self.store is not None:
+            self.store.close()
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.stop()
         event.accept()
 
-    def update_info(self, decoded_objects):
+    def update_info(self, new_codes):
         try:
-            for obj in decoded_objects:
+            for obj in new_codes:
                 code_data = obj.data.decode('utf-8')
-                if code_data not in self.detected_Codes:
-                    self.detected_Codes.add(code_data)
-                    self.infoBox.append(f'Type: {obj.type}, Data: {code_data}\n')
+                self.infoBox.append(f'Type: {obj.type}, Data: {code_data}\n')
         except Exception as e:
-            print(f"Error in update_info: {e}")
+            log.exception("Error in update_info: %s", e)
 
     def open_camera_settings(self):
-        self.camera_thread.cap.set(cv2.CAP_PROP_SETTINGS, 1)
+        cap = self.selected_feed.camera_thread.cap
+        # Not open yet, or a recording or synthetic source with no driver dialog
+        if cap is None or not cap.live:
+            QMessageBox.information(self, "Camera Settings", "Settings are only available for an open camera.")
+            return
+        cap.set(cv2.CAP_PROP_SETTINGS, 1)
+
+    def select_camera(self, index):
+        """Show another camera in the raw and bounding box views"""
+        self.selected_feed = self.feeds[index]
+
+    def update_enrichment_status(self):
+        if self.enrichment is None:
+            # Look up parts stored without Mouser info in the background
+            from src.EnrichmentQueue import EnrichmentQueue
+            self.enrichment = EnrichmentQueue(self.store, self.lookup_service.lookup, self.journal)
+            self.enrichment.start()
+            self.enrichment_timer.setInterval(1000)
+        stats = self.enrichment.stats()
+        if stats['paused_for']:
+            status = f"{stats['backlog']} waiting, offline, retrying in {stats['paused_for']:.0f}s"
+        elif stats['backlog'] or stats['in_flight']:
+            status = f"{stats['backlog']} waiting, {stats['per_minute']} resolved/min"
+        else:
+            status = f"up to date, {stats['resolved']} resolved"
+        self.enrichmentStatusLabel.setText(status)
+
+    def update_camera_stats(self):
+        for feed, label in zip(self.feeds, self.cameraStatsLabels):
+            stats = self.decode_pool.stats(feed.camera_id)
+            fps = metrics.rate(feed.camera_thread.interval_metric)
+            label.setText(f"{feed.name}: {fps:.1f} fps, {stats['frames_decoded']} decoded, "
+                          f"{stats['frames_dropped']} dropped")
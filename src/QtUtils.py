@@ -0,0 +1,16 @@
+import logging
+
+from PyQt5.QtGui import QImage, QPixmap
+
+log = logging.getLogger(__name__)
+
+
+def set_feed(frame, label):
+    """Show a BGR frame on a label, Format_BGR888 avoids a colour conversion."""
+    try:
+        h, w, ch = frame.shape
+        bytes_per_line = ch * w
+        qt_image = QImage(frame.data, w, h, bytes_per_line, QImage.Format_BGR888)
+        label.setPixmap(QPixmap.fromImage(qt_image))
+    except Exception as e:
+        log.error("Error in set_feed: %s", e)
@@ -0,0 +1,56 @@
+import json
+import sqlite3
+import threading
+import time
+
+
+class ResponseCache:
+    """On-disk cache of Mouser lookups, including parts Mouser does not know about.
+
+    Found parts live for `ttl` seconds and "not found" answers for `negative_ttl`
+    seconds, after which the next scan of that part goes back to the network.
+    """
+
+    def __init__(self, path, ttl, negative_ttl):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS lookups ("
+            " mpn TEXT PRIMARY KEY,"
+            " found INTEGER NOT NULL,"
+            " info TEXT,"
+            " fetched_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, mpn):
+        """Return (found, info) for a fresh entry, or None on a miss or expired entry."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT found, info, fetched_at FROM lookups WHERE mpn = ?", (mpn,)
+            ).fetchone()
+        if row is None:
+            return None
+        found, info, fetched_at = row
+        ttl = self.ttl if found else self.negative_ttl
+        if time.time() - fetched_at > ttl:
+            return None
+        return bool(found), json.loads(info) if info else None
+
+    def put_many(self, results):
+        """Store a {mpn: info or None} mapping as returned by search_mouser_parts."""
+        now = time.time()
+        rows = [(mpn, info is not None, json.dumps(info) if info else None, now)
+                for mpn, info in results.items()]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO lookups (mpn, found, info, fetched_at) VALUES (?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
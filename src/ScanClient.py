@@ -0,0 +1,135 @@
+"""Thin scanning station: captures frames and leaves decoding and lookups to a scan server.
+
+    python main.py station 0 --server http://inventory-box:8750 --name bench-2
+
+It needs OpenCV with numpy and python-dotenv for the settings, but not Qt,
+pyzbar or the database, so a cheap board with a camera can run it.
+"""
+import argparse
+import http.client
+import json
+import logging
+import socket
+import time
+import urllib.parse
+
+import cv2
+
+from src import Config
+from src.CodeDeduplicator import DEBOUNCED
+from src.FrameSource import open_source
+from src.Logger import setup_logging
+
+log = logging.getLogger(__name__)
+
+
+class ScanClient:
+    """Client for ScanServer over one persistent HTTP/1.1 connection."""
+
+    def __init__(self, url=Config.STATION_SERVER_URL, station=None, timeout=10.0):
+        parsed = urllib.parse.urlsplit(url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.station = station or socket.gethostname()
+        self.timeout = timeout
+        self._conn = None
+
+    def _request(self, method, path, body=None, content_type=None):
+        headers = {'X-Station': self.station}
+        if content_type:
+            headers['Content-Type'] = content_type
+        for attempt in range(2):
+            if self._conn is None:
+                self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self._conn.request(method, path, body=body, headers=headers)
+                response = self._conn.getresponse()
+                payload = json.loads(response.read() or b"{}")
+            except (http.client.HTTPException, ConnectionError):
+                # The server closed an idle keep-alive connection, reconnect once
+                self.close()
+                if attempt:
+                    raise
+                continue
+            if response.status != 200:
+                raise RuntimeError(f"{method} {path} failed with {response.status}: {payload.get('error')}")
+            return payload
+
+    def send_frame(self, frame, quality=Config.STATION_JPEG_QUALITY):
+        """JPEG encode a frame and have the server decode it, returns its decisions for every code found."""
+        ok, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            raise ValueError("Could not encode frame")
+        return self._request('POST', '/frames', jpeg.tobytes(), 'image/jpeg')
+
+    def send_codes(self, codes):
+        """Send codes decoded on the station, as (data, type) pairs."""
+        body = json.dumps({'codes': [{'data': data, 'type': symbology} for data, symbology in codes]})
+        return self._request('POST', '/codes', body.encode(), 'application/json')
+
+    def stats(self):
+        return self._request('GET', '/stats')
+
+    def events(self, station=None):
+        """Yield events from the server's stream until it closes, on a connection of its own."""
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=None)
+        query = f"?station={urllib.parse.quote(station)}" if station else ""
+        conn.request('GET', f"/events{query}", headers={'X-Station': self.station})
+        response = conn.getresponse()
+        try:
+            for line in response:
+                if line.strip():
+                    yield json.loads(line)
+        finally:
+            conn.close()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="main.py station", description="Send camera frames to a scan server")
+    parser.add_argument("source", help="camera index, stream URL, recording or synthetic source (see src/FrameSource.py)")
+    parser.add_argument("--server", default=Config.STATION_SERVER_URL)
+    parser.add_argument("--name", help="station name, defaults to the host name")
+    parser.add_argument("--fps", type=float, default=Config.STATION_FPS, help="frames sent per second")
+    args = parser.parse_args(argv)
+    setup_logging()
+
+    try:
+        source = open_source(args.source)
+    except ValueError as e:
+        log.error("%s", e)
+        return 1
+    client = ScanClient(args.server, args.name)
+    interval = 1.0 / args.fps if args.fps > 0 else 0.0
+    sent = 0
+    try:
+        while True:
+            started = time.monotonic()
+            ok, frame = source.read()
+            if not ok:
+                if source.ended:
+                    break
+                time.sleep(0.05)
+                continue
+            try:
+                answer = client.send_frame(frame)
+            except (OSError, http.client.HTTPException, RuntimeError) as e:
+                log.warning("Could not reach %s: %s", args.server, e)
+                time.sleep(1.0)
+                continue
+            sent += 1
+            for code in answer['codes']:
+                if code['status'] != DEBOUNCED:
+                    log.info("%s %s: %s", code['status'], code['type'], code['code'])
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        source.release()
+        client.close()
+    log.info("Sent %d frames.", sent)
+    return 0
@@ -0,0 +1,229 @@
+"""Append-only journal of scan events, one JSON object per line.
+
+    {"seq": 12, "ts": 1700000000.0, "type": "scan", "code": "...", "symbology": "QRCODE",
+     "camera": 0, "status": "new", "fields": {"format": "brace", "pm": "...", "qty": "10"}}
+    {"seq": 13, "ts": 1700000000.4, "type": "part", "part": {"PartNumber": "...", "Quantity": 10, ...}}
+    {"seq": 14, "ts": 1700000060.0, "type": "enrich", "part_number": "...", "info": {"Description": "...", ...}}
+
+Events are handed to a background writer which writes them in batches and
+fsyncs once per batch, so recording a scan never waits on the disk. Part
+events carry their seq into the inventory store, which commits the highest one
+it has applied with the parts themselves. After a crash the events past that
+mark are replayed; scan and enrich events are safe to replay any number of times.
+
+    python main.py journal show --since 100
+    python main.py journal rebuild rebuilt.sqlite
+"""
+import argparse
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+
+from src import Config
+from src.CodeDeduplicator import NEW
+from src.Logger import setup_logging
+from src.Metrics import metrics
+
+log = logging.getLogger(__name__)
+
+SCAN = 'scan'
+PART = 'part'
+ENRICH = 'enrich'
+JOURNAL_SEQ_KEY = 'journal_seq'
+
+
+class ScanJournal:
+    """Write-behind JSONL journal with batched fsyncs."""
+
+    def __init__(self, path, flush_interval=Config.JOURNAL_FLUSH_INTERVAL, batch_size=Config.JOURNAL_BATCH_SIZE):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._part_lock = threading.Lock()
+        self.last_seq = self._recover_tail()
+        self._file = open(path, 'a', encoding='utf-8')
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="journal-writer", daemon=True)
+        self._writer.start()
+
+    def _recover_tail(self):
+        """Cut off a line torn by a crash and return the seq of the last complete event."""
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, 'rb+') as file:
+            size = file.seek(0, os.SEEK_END)
+            # Read back from the end until a complete line is found
+            chunk = b''
+            position = size
+            while position > 0:
+                step = min(64 * 1024, position)
+                position -= step
+                file.seek(position)
+                chunk = file.read(step) + chunk
+                if chunk.count(b'\n') >= 2 or position == 0:
+                    break
+            end = chunk.rfind(b'\n') + 1
+            if position + end < size:
+                log.warning("Dropping %d bytes of an incomplete event at the end of %s",
+                            size - position - end, self.path)
+                file.truncate(position + end)
+            for line in reversed(chunk[:end].splitlines()):
+                try:
+                    return json.loads(line)['seq']
+                except (ValueError, KeyError, TypeError):
+                    continue
+        return 0
+
+    def append(self, kind, **fields):
+        """Queue an event and return its seq, never blocks on the disk."""
+        with self._lock:
+            self.last_seq += 1
+            seq = self.last_seq
+        self._queue.put({'seq': seq, 'ts': time.time(), 'type': kind, **fields})
+        return seq
+
+    def record_scan(self, code, symbology, camera, status, fields=None):
+        return self.append(SCAN, code=code, symbology=symbology, camera=camera, status=status, fields=fields)
+
+    def record_part(self, part, store=None):
+        """Journal a part and return its seq, upserting it into `store` with that seq if given.
+
+        Parts are looked up on many threads. Taking the seq and queueing the
+        upsert under one lock keeps store writes in seq order, so the store can
+        never commit a seq while a lower one is still to come. Otherwise replay
+        would skip the lower one after a crash.
+        """
+        if store is None:
+            return self.append(PART, part=dict(part))
+        with self._part_lock:
+            seq = self.append(PART, part=dict(part))
+            store.upsert_part(part, journal_seq=seq)
+        return seq
+
+    def record_enrichment(self, part_number, info):
+        return self.append(ENRICH, part_number=part_number, info=info)
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            # Collect whatever else arrives within the flush interval into the same fsync
+            batch, waiters, stop = [], [], False
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+            self._write(batch)
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                return
+
+    def _write(self, batch):
+        if not batch:
+            return
+        try:
+            self._file.write(''.join(json.dumps(event, default=str) + '\n' for event in batch))
+            self._file.flush()
+            with metrics.timer('journal.fsync'):
+                os.fsync(self._file.fileno())
+            metrics.observe('journal.batch', len(batch))
+        except OSError as e:
+            log.error("Could not write %d events to the scan journal: %s", len(batch), e)
+
+    def flush(self):
+        """Block until every event appended so far is on disk."""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def close(self):
+        self._queue.put(None)
+        self._writer.join()
+        self._file.close()
+
+    def recover(self, store):
+        """Apply the events the store had not committed when the app last stopped, returns how many."""
+        self.flush()
+        return apply_events(store, replay(self.path, after=int(store.get_meta(JOURNAL_SEQ_KEY, 0))))
+
+
+def replay(path, after=0):
+    """Yield the events of a journal with a seq above `after`, in order."""
+    if not os.path.exists(path):
+        return
+    with open(path, encoding='utf-8') as file:
+        for number, line in enumerate(file, 1):
+            try:
+                event = json.loads(line)
+            except ValueError:
+                log.warning("Skipping unreadable line %d of %s", number, path)
+                continue
+            if event.get('seq', 0) > after:
+                yield event
+
+
+def apply_events(store, events):
+    """Replay events into a store: new scans are recorded, parts upserted with their seq and Mouser info filled in."""
+    applied = 0
+    for event in events:
+        if event['type'] == SCAN and event.get('status') == NEW:
+            store.add_code(event['code'])
+        elif event['type'] == PART:
+            store.upsert_part(event['part'], journal_seq=event['seq'])
+        elif event['type'] == ENRICH:
+            store.flush()  # The part may still be queued, and info updates go straight to the database
+            store.update_part_info(event['part_number'], event['info'], replay=True)
+        else:
+            continue
+        applied += 1
+    return applied
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="main.py journal", description="Inspect or replay the scan journal")
+    parser.add_argument("--path", default=Config.JOURNAL_PATH, help="journal file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    show = commands.add_parser("show", help="print events as JSON lines")
+    show.add_argument("--since", type=int, default=0, help="only events after this seq")
+    rebuild = commands.add_parser("rebuild", help="replay every event into an inventory database")
+    rebuild.add_argument("database", help="SQLite file to create, must not exist yet")
+    args = parser.parse_args(argv)
+    setup_logging()
+
+    if args.command == "show":
+        for event in replay(args.path, args.since):
+            sys.stdout.write(json.dumps(event) + "\n")
+        return 0
+
+    if os.path.exists(args.database):
+        log.error("%s already exists, rebuild into a new file", args.database)
+        return 1
+    from src.InventoryStore import InventoryStore
+    store = InventoryStore(args.database)
+    try:
+        applied = apply_events(store, replay(args.path))
+    finally:
+        store.close()
+    log.info("Replayed %d events into %s.", applied, args.database)
+    return 0
@@ -0,0 +1,316 @@
+"""Scan service for thin stations: they send frames or decoded codes, this box does the rest.
+
+    python main.py serve --host 0.0.0.0 --port 8750
+
+    POST /frames   JPEG or PNG body, decoded here with a tracking decoder per station
+    POST /codes    {"codes": [{"data": "...", "type": "QRCODE"}, ...]} already decoded on the station
+    GET  /events   newline delimited JSON stream of scan and part events, ?station= to filter
+    GET  /stats    counters, latencies and the enrichment backlog
+
+Stations name themselves with an X-Station header (or ?station=). Every
+station goes through one deduplicator, journal, store and PartLookup, so a reel
+seen by two stations counts once and a part number is looked up once, over one
+pooled connection, however many stations scan it. POST answers carry each
+code's decision straight away; Mouser results follow on /events.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import cv2
+import numpy as np
+
+from src import Config
+from src.CodeDeduplicator import CodeDeduplicator, DEBOUNCED, KNOWN
+from src.Logger import setup_logging
+from src.Metrics import metrics
+from src.RoiDecoder import RoiDecoder
+from src.Utils import extract_part_data, make_part
+
+log = logging.getLogger(__name__)
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class ScanServer:
+    """asyncio HTTP front end over the shared decode, parse, lookup and store pipeline.
+
+    Decoding and store access run on a thread pool so the event loop only
+    moves bytes. Lookup results arrive on PartLookup's threads and are handed
+    to the loop to be streamed to subscribers, slow subscribers lose events
+    rather than hold anyone up.
+    """
+
+    def __init__(self, store, journal, lookup, enrichment=None, host=Config.SERVER_HOST, port=Config.SERVER_PORT,
+                 workers=Config.DECODE_WORKERS, max_body=Config.SERVER_MAX_BODY):
+        self.store = store
+        self.journal = journal
+        self.lookup = lookup
+        self.enrichment = enrichment
+        self.host = host
+        self.port = port
+        self.max_body = max_body
+        self.dedup = CodeDeduplicator(store)
+        self.executor = ThreadPoolExecutor(max_workers=workers or None, thread_name_prefix="serve")
+        self._decoders = {}
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._loop = None
+        self._server = None
+        self.stations = {}  # Station -> counters
+
+    # HTTP
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        log.info("Scan server listening on http://%s:%d", self.host, self.port)
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()  # A backed up subscriber loses one event rather than never hearing the end
+            queue.put_nowait(None)
+        self.executor.shutdown(wait=True)
+
+    async def _handle(self, reader, writer):
+        peer = writer.get_extra_info('peername')
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                if length > self.max_body:
+                    self._respond(writer, 413, {'error': f"body over {self.max_body} bytes"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                path, _, query = target.partition('?')
+                params = {key: values[-1] for key, values in urllib.parse.parse_qs(query).items()}
+                station = headers.get('x-station') or params.get('station') or (peer[0] if peer else 'unknown')
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+
+                if method == 'GET' and path == '/events':
+                    await self._stream_events(writer, params.get('station'))
+                    break
+                start = time.perf_counter()
+                status, payload = await self._route(method, path, station, body)
+                metrics.observe(f'server.{path.strip("/") or "root"}', (time.perf_counter() - start) * 1000)
+                self._respond(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except ValueError as e:
+            log.warning("Bad request from %s: %s", peer, e)
+            self._respond(writer, 400, {'error': str(e)}, False)
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, station, body):
+        routes = {
+            '/frames': ('POST', self._scan_frame),
+            '/codes': ('POST', self._scan_codes),
+            '/stats': ('GET', self._stats),
+            '/health': ('GET', lambda station, body: {'ok': True}),
+        }
+        route = routes.get(path)
+        if route is None:
+            return 404, {'error': f"no route {path}"}
+        if method != route[0]:
+            return 405, {'error': f"{path} takes {route[0]}"}
+        try:
+            return 200, await self._loop.run_in_executor(self.executor, route[1], station, body)
+        except ValueError as e:
+            return 400, {'error': str(e)}
+        except Exception as e:
+            log.exception("Error handling %s from %s: %s", path, station, e)
+            return 500, {'error': str(e)}
+
+    @staticmethod
+    def _respond(writer, status, payload, keep_alive):
+        body = json.dumps(payload, default=str).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + body
+        )
+
+    async def _stream_events(self, writer, station):
+        queue = asyncio.Queue(maxsize=Config.SERVER_EVENT_BACKLOG)
+        self._subscribers.add(queue)
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                     b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    event = {}  # Blank line heartbeat, notices clients that went away
+                if event is None:
+                    break
+                if station and event and event.get('station') != station:
+                    continue
+                line = (json.dumps(event, default=str) + "\n").encode() if event else b"\n"
+                writer.write(b"%x\r\n%s\r\n" % (len(line), line))
+                await writer.drain()
+            writer.write(b"0\r\n\r\n")
+        finally:
+            self._subscribers.discard(queue)
+
+    def _publish(self, event):
+        """Queue an event for every subscriber, from any thread."""
+        self._loop.call_soon_threadsafe(self._broadcast, event)
+
+    def _broadcast(self, event):
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                metrics.count('server.events_dropped')
+
+    # Pipeline, run on the executor
+
+    def _scan_frame(self, station, body):
+        frame = cv2.imdecode(np.frombuffer(body, np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError("body is not an image OpenCV can read")
+        decoder = self._decoders.get(station)
+        if decoder is None:
+            # Region tracking only makes sense within one station's stream of frames
+            decoder = self._decoders.setdefault(station, RoiDecoder())
+        start = time.perf_counter()
+        with metrics.timer('decode'):
+            codes = decoder.decode(frame)
+        decode_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._station(station)['frames'] += 1
+        return {'station': station, 'decode_ms': decode_ms,
+                'codes': self._process(station, [(code.data, code.type) for code in codes])}
+
+    def _scan_codes(self, station, body):
+        try:
+            request = json.loads(body or b"{}")
+            entries = request.get('codes', [])
+            if not isinstance(entries, list):
+                raise TypeError("codes is not a list")
+            codes = []
+            for code in entries:
+                if isinstance(code, str):
+                    code = {'data': code}
+                data, symbology = code['data'], code.get('type', 'UNKNOWN')
+                if not isinstance(data, str) or not isinstance(symbology, str):
+                    raise TypeError("data and type must be strings")
+                codes.append((data, symbology))
+        except (AttributeError, KeyError, TypeError) as e:
+            raise ValueError(f"expected {{\"codes\": [{{\"data\": ..., \"type\": ...}}]}}: {e}") from e
+        return {'station': station, 'codes': self._process(station, codes)}
+
+    def _process(self, station, codes):
+        """Dedup, parse, journal and look up decoded codes, like QrReader.detect_codes does for its cameras."""
+        results = []
+        with self._lock:
+            counters = self._station(station)
+        for data, symbology in codes:
+            code = data.decode('utf-8', errors='replace') if isinstance(data, bytes) else data
+            decision = self.dedup.check(code)
+            result = {'station': station, 'code': code, 'type': symbology, 'status': decision}
+            results.append(result)
+            if decision == DEBOUNCED:
+                continue
+            with self._lock:
+                counters[decision] += 1
+            with metrics.timer('parse'):
+                fields = extract_part_data(code) or None
+            self.journal.record_scan(code, symbology, station, decision, fields)
+            result['fields'] = fields
+            if fields:
+                if decision == KNOWN:
+                    result['part'] = self.store.get_part(fields['pm'])
+                else:
+                    future = self.lookup.lookup(fields['pm'])
+                    future.add_done_callback(partial(self._resolved, station, fields['pm'], fields.get('qty')))
+            self._publish(dict(result, event='scan'))
+        return results
+
+    def _resolved(self, station, part_number, qty, future):
+        state, info = future.result()
+        # Stored whatever the outcome, failed lookups are left to the enrichment queue
+        part = make_part(part_number, qty, info)
+        self.journal.record_part(part, self.store)
+        if state is None and self.enrichment is not None:
+            self.enrichment.notify()
+        self._publish({'event': 'part', 'station': station, 'part_number': part_number, 'found': state,
+                       'part': part})
+
+    def _station(self, station):
+        return self.stations.setdefault(station, {'frames': 0, 'new': 0, 'known': 0})
+
+    def _stats(self, station, body):
+        with self._lock:
+            stations = {name: dict(counters) for name, counters in self.stations.items()}
+        return {
+            'stations': stations,
+            'codes': self.store.code_count(),
+            'subscribers': len(self._subscribers),
+            'enrichment': self.enrichment.stats() if self.enrichment is not None else None,
+            'metrics': metrics.snapshot(),
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="main.py serve", description="Serve the scan pipeline to thin stations")
+    parser.add_argument("--host", default=Config.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=Config.SERVER_PORT)
+    args = parser.parse_args(argv)
+    setup_logging()
+
+    from src.EnrichmentQueue import EnrichmentQueue
+    from src.InventoryStore import InventoryStore
+    from src.PartLookup import PartLookup
+    from src.ResponseCache import ResponseCache
+    from src.ScanJournal import ScanJournal
+
+    store = InventoryStore(Config.INVENTORY_DB_PATH)
+    store.import_csv()
+    journal = ScanJournal(Config.JOURNAL_PATH)
+    journal.recover(store)
+    lookup = PartLookup(ResponseCache(Config.LOOKUP_CACHE_PATH, Config.LOOKUP_CACHE_TTL, Config.LOOKUP_NEGATIVE_TTL))
+    enrichment = EnrichmentQueue(store, lookup, journal)
+    enrichment.start()
+    server = ScanServer(store, journal, lookup, enrichment, args.host, args.port)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        log.info("Shutting down...")
+    finally:
+        enrichment.stop()
+        lookup.close()
+        journal.close()
+        store.close()
+    return 0
@@ -0,0 +1,23 @@
+import logging
+import time
+
+from src.Metrics import metrics
+
+log = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """Milliseconds from launch to each startup milestone, logged and kept as metrics gauges."""
+
+    def __init__(self, start=None):
+        self.start = start if start is not None else time.perf_counter()
+        self.milestones = {}
+
+    def mark(self, name):
+        """Record a milestone the first time it is reached, later calls are ignored."""
+        if name in self.milestones:
+            return
+        elapsed = (time.perf_counter() - self.start) * 1000
+        self.milestones[name] = elapsed
+        metrics.gauge(f'startup.{name}_ms', round(elapsed, 1))
+        log.info("Startup: %s after %.0f ms", name, elapsed)
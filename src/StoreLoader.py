@@ -0,0 +1,38 @@
+import logging
+import sqlite3
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from src.InventoryStore import InventoryStore
+from src.ScanJournal import ScanJournal
+
+log = logging.getLogger(__name__)
+
+
+class StoreLoader(QThread):
+    """Opens the inventory store and scan journal off the GUI thread.
+
+    Runs the one-time CSV import, then replays the journal events the store
+    had not committed when the app last stopped.
+    """
+    store_loaded = pyqtSignal(object, object)
+    store_failed = pyqtSignal(str)
+
+    def __init__(self, path, journal_path):
+        super().__init__()
+        self.path = path
+        self.journal_path = journal_path
+
+    def run(self):
+        try:
+            store = InventoryStore(self.path)
+            store.import_csv()
+            journal = ScanJournal(self.journal_path)
+            replayed = journal.recover(store)
+        except (sqlite3.Error, OSError) as e:
+            log.error("Could not open the inventory store %s: %s", self.path, e)
+            self.store_failed.emit(str(e))
+            return
+        if replayed:
+            log.info("Replayed %d journal events the store had not committed.", replayed)
+        self.store_loaded.emit(store, journal)
@@ -1,85 +1,95 @@
-import os
-import requests
-from dotenv import load_dotenv
-from PyQt5.QtGui import QImage, QPixmap
+import logging
 
-def set_feed(frame, label):
-    try:
-        h, w, ch = frame.shape
-        bytes_per_line = ch * w
-        qt_image = QImage(frame.data, w, h, bytes_per_line, QImage.Format_RGB888)
-        label.setPixmap(QPixmap.fromImage(qt_image))
-    except Exception as e:
-        print(f"Error in set_feed: {e}")
+from src import Config
+from src.LabelParser import parse_label
+
+log = logging.getLogger(__name__)
 
 
 def extract_part_data(code_data):
-    # Decode bytes to string if necessary
-    if isinstance(code_data, bytes):
-        code_data = code_data.decode('utf-8')
-
-    # Remove the curly braces and split the string into key-value pairs
-    print(code_data)
-    key_value_pairs = code_data.strip('{}').split(',')
-    part_data = {}
-
-    # Iterate through the pairs and extract values for 'pm' and 'qty'
-    for pair in key_value_pairs:
-        # Split only if there is a key and a value
-        if ':' in pair:
-            key, value = pair.split(':', 1)
-            part_data[key.strip()] = value.strip()
-        else:
-            print(f"Warning: Skipping malformed pair '{pair}'")
+    """Part data from any supported label format, an empty dict if the payload isn't one.
 
+    'pm' holds the part number and 'qty' the quantity, see LabelParser for the rest.
+    """
+    part_data = parse_label(code_data)
+    if part_data is None:
+        log.debug("Unrecognised label %r", code_data)
+        return {}
     return part_data  # Return the dictionary containing part data
 
 
-def build_part_data(mpn, qty):
-    load_dotenv()
-    #get name, datasheet info ,etc
-    #the dict would look something like: {'mp':'xxxx','qty':xxx,'name':"xxx",'description': "xxxx" 'type':"xxxx", 'datasheet':"xxxx"}
-    api_key = os.getenv("MOUSER_API_KEY")  # Fetch the API key from environment variables
-    url = f"https://api.mouser.com/api/v1/search/partnumber?apiKey={api_key}"
+def make_part(mpn, qty, info=None):
+    """Build the component row stored for a part from its Mouser info (or None if unknown)."""
+    info = info or {}
+    return {
+        'PartNumber': mpn,
+        'Quantity': qty,
+        'Description': info.get('Description'),
+        'DataSheet': info.get('DataSheet'),
+        'ImagePath': info.get('ImagePath')
+    }
+
+
+def search_mouser_parts(mpns, session=None, timeout=Config.MOUSER_TIMEOUT):
+    """Search Mouser for up to MOUSER_BATCH_SIZE part numbers in a single request.
+
+    Returns a dict mapping every requested part number to its info (or None if
+    Mouser has no match), or None if the API reported errors. HTTP failures
+    raise requests.RequestException.
+    """
+    import requests  # Deferred so parsing labels doesn't pull in the HTTP stack at startup
+
+    url = f"{Config.MOUSER_API_URL}/search/partnumber?apiKey={Config.MOUSER_API_KEY}"
     headers = {
         "Content-Type": "application/json"
     }
     request_body = {
         "SearchByPartRequest": {
-            "mouserPartNumber": mpn  # Use the provided mpn variable
+            "mouserPartNumber": "|".join(mpns)
         }
     }
-    try:
-        response = requests.post(url, json=request_body, headers=headers)
-        response.raise_for_status()  # Raise an error for bad responses
-        data = response.json()
+    response = (session or requests).post(url, json=request_body, headers=headers, timeout=timeout)
+    response.raise_for_status()  # Raise an error for bad responses
+    data = response.json()
+
+    # Check for errors in the response
+    if data["Errors"]:
+        log.warning("Errors in response: %s", data['Errors'])
+        return None
 
-        # Check for errors in the response
-        if data["Errors"]:
-            print(f"Errors in response: {data['Errors']}")
+    parts = data["SearchResults"]["Parts"] if data["SearchResults"]["NumberOfResult"] > 0 else []
+    results = {mpn: None for mpn in mpns}
+    # Single and batched searches match the same way, so a part gets the same answer
+    # whatever it was batched with: an exact Mouser or manufacturer part number first,
+    # then the first result containing it (NE555 -> NE555P, 595-NE555P)
+    for exact in (True, False):
+        for part in parts:
+            keys = [key.upper() for key in (part.get("MouserPartNumber"), part.get("ManufacturerPartNumber")) if key]
+            for mpn in mpns:
+                wanted = mpn.upper()
+                if results[mpn] is None and any(key == wanted if exact else wanted in key for key in keys):
+                    results[mpn] = {
+                        'Description': part.get("Description"),
+                        'DataSheet': part.get("DataSheetUrl"),
+                        'ImagePath': part.get("ImagePath")
+                    }
+    return results
+
+
+def build_part_data(mpn, qty, session=None):
+    #get name, datasheet info ,etc
+    #the dict would look something like: {'PartNumber':'xxxx','Quantity':xxx,'Description': "xxxx", 'DataSheet':"xxxx", 'ImagePath':"xxxx"}
+    import requests
+    try:
+        results = search_mouser_parts([mpn], session)
+        if results is None:
             return False, None
 
-        # Ensure there is at least one result
-        if data["SearchResults"]["NumberOfResult"] > 0:
-            mouserPart = {
-                'PartNumber': mpn,
-                'Quantity': qty,
-                'Description': data["SearchResults"]["Parts"][0]["Description"],
-                'DataSheet' : data["SearchResults"]["Parts"][0]["DataSheetUrl"],
-                'ImagePath' : data["SearchResults"]["Parts"][0]["ImagePath"]
-            }
-            #print(mouserPart)
-            return True, mouserPart
+        if results[mpn] is not None:
+            return True, make_part(mpn, qty, results[mpn])
         else:
-            print("No results found for the provided MPN.")
-            genericPart = {
-                'PartNumber': mpn,
-                'Quantity': qty,
-                'Description': None,
-                'DataSheet': None,
-                'ImagePath': None
-            }
-            return False, genericPart
+            log.info("No results found for %s", mpn)
+            return False, make_part(mpn, qty)
     except requests.exceptions.RequestException as e:
-        print(f"HTTP request failed: {e}")
+        log.warning("HTTP request failed: %s", e)
         return None